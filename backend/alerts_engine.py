@@ -4,11 +4,393 @@ Actionable Alerts Engine
 Rule-based recommendation system that generates supervisor-actionable alerts
 based on worker biometrics, machine telemetry, and environmental conditions.
 
-Each rule evaluates the current state and produces a structured recommendation
-with severity, action text, and the triggering metric.
+Rules are declared in the ALERT_RULES table (metric, comparator, threshold,
+severity, action, cooldown) and compiled into vectorized threshold checks over
+columnar NumPy arrays of entity metrics. Cooldown bookkeeping only runs for
+the entities that actually breached a threshold, against a bounded
+entity × rule timestamp table that expires idle entities on a time wheel.
+
+Besides instantaneous thresholds, rules can be streaming: sustained-for-N-
+seconds, rolling mean / max over a window, rate of change, and enter/exit
+hysteresis bands. These read per-entity rolling aggregates that observe()
+updates incrementally every tick at O(1) (amortized) cost per entity.
+
+Recommendation IDs are unique and monotonic: "rec-<site>-<engine start ms>-<seq>",
+so they sort by key in emission order. AlertLog publishes them as an append-only
+map under `recommendations/alerts/<id>`, retiring expired alerts with
+path deletes, so clients can sync with orderByKey().startAfter(<last seen id>).
 """
 
-import time
+import itertools
+import math
+from collections import deque, namedtuple
+
+import numpy as np
+
+from clock import SYSTEM_CLOCK
+from config import (ALERT_TTL_SECONDS, ALERT_LOG_MAX, ALERT_HR_EXIT_BPM, ALERT_STRESS_SUSTAIN_S,
+                    ALERT_COOLANT_RISE_C_PER_S)
+
+
+# ─────────────────────────────────────────────────
+# Declarative Rule Table
+# ─────────────────────────────────────────────────
+# rule_id:     cooldown key suffix ("<target_id>_<rule_id>")
+# target_type: "worker" | "machine" | "site"
+# message:     format string with {id} (target ID) and {value} (metric value)
+# cooldown:    seconds between repeats per target (None = engine default)
+# else_of:     only evaluated for targets where that rule did not fire (if/elif)
+# kind:        "threshold" (instantaneous sample), "sustained" (condition held
+#              for `window` s), "mean" / "max" (rolling aggregate over `window` s),
+#              "rate" (change per second across `window` s), "hysteresis"
+#              (enters at threshold, stays latched until the value fails the
+#              comparator against exit_threshold)
+# The default table uses instantaneous thresholds; the streaming variants of
+# hr / stress and the temp_rise rule are switched on from config.py.
+AlertRule = namedtuple(
+    "AlertRule",
+    ["rule_id", "target_type", "metric", "comparator", "threshold",
+     "severity", "action", "message", "cooldown", "else_of",
+     "kind", "window", "exit_threshold"],
+    defaults=(None, None, "threshold", None, None),
+)
+
+RULE_KINDS = ("threshold", "sustained", "mean", "max", "rate", "hysteresis")
+WINDOW_KINDS = ("mean", "max", "rate")  # backed by a RollingWindow
+
+ALERT_RULES = (
+    # ── Worker Rules ──
+    AlertRule("cis_crit", "worker", "cis_score", ">=", 0.80, "CRITICAL",
+              "ASSIGN 15-MIN MANDATORY BREAK",
+              "Worker {id}: CIS Score {value:.2f} – immediate rest required."),
+    AlertRule("cis_warn", "worker", "cis_score", ">=", 0.55, "WARNING",
+              "SCHEDULE BREAK WITHIN 30 MINUTES",
+              "Worker {id}: CIS Score rising ({value:.2f}) – schedule rest.",
+              else_of="cis_crit"),
+    AlertRule("hr", "worker", "heart_rate_bpm", ">=", 130, "CRITICAL",
+              "REMOVE FROM ACTIVE DUTY IMMEDIATELY",
+              "Worker {id}: Heart rate {value} BPM – cardiac stress risk.",
+              kind="threshold" if ALERT_HR_EXIT_BPM is None else "hysteresis",
+              exit_threshold=ALERT_HR_EXIT_BPM),
+    AlertRule("fatigue", "worker", "fatigue_percent", ">=", 70, "WARNING",
+              "ROTATE TO LIGHTER DUTIES",
+              "Worker {id}: Fatigue at {value}% – reassign to lighter tasks."),
+
+    # ── Machine Rules ──
+    AlertRule("vib", "machine", "vibration_mm_s", ">=", 8.0, "WARNING",
+              "CAP ENGINE LOAD TO 50%",
+              "Machine {id}: Vibration {value} mm/s – reduce load to prevent bearing damage."),
+    AlertRule("temp", "machine", "coolant_temp", ">=", 95.0, "CRITICAL",
+              "SWITCH TO IDLE – COOLDOWN REQUIRED",
+              "Machine {id}: Coolant temp {value}°C – overheat risk."),
+    AlertRule("stress", "machine", "stress_index", ">=", 70.0, "WARNING",
+              "REDUCE OPERATING INTENSITY",
+              "Machine {id}: Stress index {value}% – sustained damage risk.",
+              kind="threshold" if ALERT_STRESS_SUSTAIN_S is None else "sustained",
+              window=ALERT_STRESS_SUSTAIN_S),
+    *(() if ALERT_COOLANT_RISE_C_PER_S is None else (
+        AlertRule("temp_rise", "machine", "coolant_temp", ">=", ALERT_COOLANT_RISE_C_PER_S, "WARNING",
+                  "INSPECT COOLING SYSTEM",
+                  "Machine {id}: Coolant temp rising {value:.2f}°C/s – possible coolant loss.",
+                  kind="rate", window=30),
+    )),
+
+    # ── Environmental Rules ──
+    AlertRule("heat", "site", "ambient_temp_c", ">=", 40.0, "WARNING",
+              "INCREASE HYDRATION BREAKS TO EVERY 30 MIN",
+              "Site ambient temperature {value}°C – heat stress protocol required."),
+    AlertRule("extreme_heat", "site", "ambient_temp_c", ">=", 46.0, "CRITICAL",
+              "SUSPEND ALL OUTDOOR OPERATIONS",
+              "EXTREME HEAT: {value}°C – cease outdoor work immediately."),
+    AlertRule("humidity", "site", "humidity_pct", ">=", 80.0, "INFO",
+              "MONITOR WORKERS FOR HEAT EXHAUSTION",
+              "Site humidity {value}% – increased fatigue risk for all workers."),
+)
+
+COMPARATORS = {
+    ">=": np.greater_equal,
+    ">": np.greater,
+    "<=": np.less_equal,
+    "<": np.less,
+}
+
+# Value assumed when an entity dict lacks a metric
+METRIC_DEFAULTS = {"ambient_temp_c": 30, "humidity_pct": 50}
+
+TARGET_TYPES = ("worker", "machine", "site")
+
+
+class RollingWindow:
+    """Per-entity ring buffer of the last `size` samples with O(1) aggregates.
+
+    - mean: running sum (re-summed exactly once per block to cancel drift)
+    - max:  streaming van Herk / Gil-Werman: suffix maxima of the previous
+            block (computed once every `size` samples) + running prefix max
+            of the current block
+    - rate: newest minus the sample leaving the window
+    """
+
+    def __init__(self, size, initial_rows=64):
+        self.size = size
+        self._buf = np.zeros((initial_rows, size))
+        self._pos = np.zeros(initial_rows, dtype=np.int64)     # next write index
+        self._count = np.zeros(initial_rows, dtype=np.int64)   # samples seen (saturates at size)
+        self._sum = np.zeros(initial_rows)
+        self._prefix_max = np.full(initial_rows, -np.inf)
+        self._suffix_max = np.full((initial_rows, size + 1), -np.inf)
+        self._delta = np.full(initial_rows, np.nan)            # newest - oldest (full window only)
+
+    def _ensure(self, n_rows):
+        if n_rows <= len(self._pos):
+            return
+        extra = max(n_rows, 2 * len(self._pos)) - len(self._pos)
+        self._buf = np.vstack([self._buf, np.zeros((extra, self.size))])
+        self._pos = np.concatenate([self._pos, np.zeros(extra, dtype=np.int64)])
+        self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+        self._sum = np.concatenate([self._sum, np.zeros(extra)])
+        self._prefix_max = np.concatenate([self._prefix_max, np.full(extra, -np.inf)])
+        self._suffix_max = np.vstack([self._suffix_max, np.full((extra, self.size + 1), -np.inf)])
+        self._delta = np.concatenate([self._delta, np.full(extra, np.nan)])
+
+    def push(self, rows, values):
+        """Append one sample per row (rows must be unique)."""
+        self._ensure(int(rows.max()) + 1 if len(rows) else 0)
+        pos = self._pos[rows]
+        full = self._count[rows] >= self.size
+
+        # Block boundary: the buffer holds exactly the previous window
+        starting = rows[pos == 0]
+        if len(starting):
+            block = self._buf[starting]
+            seen = (self._count[starting] >= self.size)[:, None]  # first block: nothing to carry over
+            self._suffix_max[starting, :self.size] = np.where(
+                seen, np.maximum.accumulate(block[:, ::-1], axis=1)[:, ::-1], -np.inf)
+            self._sum[starting] = np.where(seen[:, 0], block.sum(axis=1), 0.0)
+            self._prefix_max[starting] = -np.inf
+
+        oldest = self._buf[rows, pos]
+        self._delta[rows] = np.where(full, values - oldest, np.nan)
+        self._sum[rows] += values - np.where(full, oldest, 0.0)
+        self._buf[rows, pos] = values
+        self._prefix_max[rows] = np.maximum(self._prefix_max[rows], values)
+        self._pos[rows] = (pos + 1) % self.size
+        self._count[rows] = np.minimum(self._count[rows] + 1, self.size)
+
+    def reset(self, rows):
+        """Clear rows for reuse by another entity."""
+        rows = rows[rows < len(self._pos)]  # rows never pushed are still clear
+        self._buf[rows] = 0.0
+        self._pos[rows] = 0
+        self._count[rows] = 0
+        self._sum[rows] = 0.0
+        self._prefix_max[rows] = -np.inf
+        self._suffix_max[rows] = -np.inf
+        self._delta[rows] = np.nan
+
+    def mean(self, rows):
+        return self._sum[rows] / np.maximum(self._count[rows], 1)
+
+    def max(self, rows):
+        # Samples of the previous block still in the window start at the write position;
+        # at pos 0 the current block is the whole window (suffix column `size` is -inf)
+        pos = self._pos[rows]
+        return np.maximum(self._prefix_max[rows], self._suffix_max[rows, np.where(pos == 0, self.size, pos)])
+
+    def rate(self, rows, sample_period):
+        """Change per second across the full window (NaN until the window has filled)."""
+        return self._delta[rows] / (self.size * sample_period)
+
+
+class _TargetStream:
+    """Streaming state for one target type: entity rows, rolling windows and
+    per-rule sustained / hysteresis state.
+
+    At most max_rows entities hold a row; a new entity beyond that takes over
+    (and clears) the row of the entity seen least recently, so state stays
+    bounded under wearable churn like the CooldownTable.
+    """
+
+    def __init__(self, rules, sample_period, initial_rows=64, max_rows=50000):
+        self._ids = {}  # entity id → row
+        self._row_ids = [None] * initial_rows  # row → entity id
+        self._n = initial_rows
+        self.max_rows = max_rows
+        self._seen = np.zeros(initial_rows, dtype=np.int64)  # rows() call that last included the row
+        self._calls = 0
+        self._free = []
+        self._next_row = 0
+        self.evictions = 0
+        self._last_ids = None  # the whole fleet usually arrives in the same order every tick
+        self._last_rows = None
+        self.windows = {}   # (metric, n samples) → RollingWindow
+        self.since = {}     # rule index → time the condition started holding (NaN = not holding)
+        self.latched = {}   # rule index → hysteresis state
+        for rule, _, index in rules:
+            if rule.kind in WINDOW_KINDS:
+                size = max(1, int(round(rule.window / sample_period)))
+                self.windows.setdefault((rule.metric, size), RollingWindow(size, initial_rows))
+            elif rule.kind == "sustained":
+                self.since[index] = np.full(initial_rows, np.nan)
+            elif rule.kind == "hysteresis":
+                self.latched[index] = np.zeros(initial_rows, dtype=bool)
+
+    def rows(self, ids):
+        self._calls += 1
+        if ids == self._last_ids:
+            rows = self._last_rows
+        else:
+            index = self._ids
+            unique = dict.fromkeys(ids)
+            if len(unique) > self.max_rows:
+                raise ValueError(f"{len(unique)} entities in one batch exceed max_rows={self.max_rows}")
+            new = [eid for eid in unique if eid not in index]
+            if new:
+                # Stamp the known entities first so this batch never evicts its own rows
+                known = np.fromiter((index[eid] for eid in ids if eid in index), dtype=np.int64)
+                self._seen[known] = self._calls
+                self._assign(new)
+            rows = np.fromiter((index[eid] for eid in ids), dtype=np.int64, count=len(ids))
+            if len(ids) == len(index):  # cache whole-population lookups only
+                self._last_ids, self._last_rows = list(ids), rows
+        self._seen[rows] = self._calls
+        return rows
+
+    def _assign(self, new):
+        fresh = min(len(new) - len(self._free), self.max_rows - self._next_row)
+        if fresh > 0:
+            if self._next_row + fresh > self._n:
+                self._grow(min(self.max_rows, max(self._next_row + fresh, 2 * self._n)))
+            self._free.extend(range(self._next_row + fresh - 1, self._next_row - 1, -1))
+            self._next_row += fresh
+        if len(new) > len(self._free):
+            self._evict(len(new) - len(self._free))
+        for eid in new:
+            row = self._free.pop()
+            self._ids[eid] = row
+            self._row_ids[row] = eid
+            self._seen[row] = self._calls
+
+    def _grow(self, n):
+        extra = n - self._n
+        for index, since in self.since.items():
+            self.since[index] = np.concatenate([since, np.full(extra, np.nan)])
+        for index, latched in self.latched.items():
+            self.latched[index] = np.concatenate([latched, np.zeros(extra, dtype=bool)])
+        self._seen = np.concatenate([self._seen, np.zeros(extra, dtype=np.int64)])
+        self._row_ids.extend([None] * extra)
+        self._n = n
+
+    def _evict(self, k):
+        """Free the k least recently seen occupied rows, clearing their streaming state."""
+        seen = self._seen[:self._next_row].copy()
+        seen[self._free] = np.iinfo(np.int64).max  # unoccupied rows are never candidates
+        rows = np.argpartition(seen, k - 1)[:k]
+        for row in rows.tolist():
+            del self._ids[self._row_ids[row]]
+            self._row_ids[row] = None
+        for window in self.windows.values():
+            window.reset(rows)
+        for since in self.since.values():
+            since[rows] = np.nan
+        for latched in self.latched.values():
+            latched[rows] = False
+        self._free.extend(rows.tolist())
+        self._last_ids = self._last_rows = None
+        self.evictions += k
+
+
+class CooldownTable:
+    """Last-fired timestamps as a dense (entity × rule) float array.
+
+    Entities get an integer row on first alert. Rows whose every cooldown has
+    lapsed are recycled via a one-second-slot time wheel, and when the table is
+    at capacity the least recently fired entity is evicted, so memory stays
+    bounded under wearable churn (re-provisioned IDs never accumulate).
+    """
+
+    def __init__(self, n_rules, max_cooldown, max_entities=50000, initial_rows=256):
+        self.n_rules = n_rules
+        self.max_cooldown = max_cooldown
+        self.max_entities = max_entities
+        self._last = np.full((min(initial_rows, max_entities), n_rules), -np.inf)
+        self._last_any = np.full(len(self._last), -np.inf)  # latest fire per row
+        self._rows = {}       # entity_id → row
+        self._ids = {}        # row → entity_id
+        self._free = []
+        self._next_row = 0
+
+        # Time wheel: slot = whole second at which a row's cooldowns all lapse
+        self._wheel = [set() for _ in range(int(math.ceil(max_cooldown)) + 2)]
+        self._wheel_cursor = None
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _row(self, entity_id, now):
+        row = self._rows.get(entity_id)
+        if row is not None:
+            return row
+        if self._free:
+            row = self._free.pop()
+        elif self._next_row < self.max_entities:
+            row = self._next_row
+            self._next_row += 1
+            if row >= len(self._last):
+                self._grow(min(self.max_entities, 2 * len(self._last)))
+        else:
+            # At capacity: evict the entity that fired least recently
+            row = int(np.argmin(self._last_any[:self._next_row]))
+            self._release(row)
+            self._free.remove(row)
+            self.evictions += 1
+        self._rows[entity_id] = row
+        self._ids[row] = entity_id
+        self._last_any[row] = now  # so rows registered in this batch are not evicted first
+        return row
+
+    def _grow(self, capacity):
+        extra = capacity - len(self._last)
+        self._last = np.vstack([self._last, np.full((extra, self.n_rules), -np.inf)])
+        self._last_any = np.concatenate([self._last_any, np.full(extra, -np.inf)])
+
+    def _release(self, row):
+        del self._rows[self._ids.pop(row)]
+        self._last[row] = -np.inf
+        self._last_any[row] = -np.inf
+        self._free.append(row)
+
+    def allow(self, entity_ids, rule_index, now, cooldown):
+        """For each entity, check the rule's cooldown and stamp `now` where it passes.
+        Returns a bool array aligned with entity_ids."""
+        rows = np.fromiter((self._row(eid, now) for eid in entity_ids), dtype=np.int64, count=len(entity_ids))
+        ok = now - self._last[rows, rule_index] >= cooldown
+        fired = rows[ok]
+        if len(fired):
+            self._last[fired, rule_index] = now
+            self._last_any[fired] = now
+            slot = self._wheel[int(math.ceil(now + self.max_cooldown)) % len(self._wheel)]
+            slot.update(fired.tolist())
+        # Breaches that stayed on cooldown keep their existing wheel slot;
+        # a newly registered row always passes, so every row is on the wheel.
+        return ok
+
+    def expire(self, now):
+        """Advance the wheel to `now`, recycling rows whose cooldowns have all lapsed."""
+        second = int(now)
+        if self._wheel_cursor is None:
+            self._wheel_cursor = second
+            return
+        steps = min(second - self._wheel_cursor, len(self._wheel))
+        for t in range(self._wheel_cursor + 1, self._wheel_cursor + 1 + steps):
+            slot = self._wheel[t % len(self._wheel)]
+            for row in list(slot):
+                if row in self._ids and self._last_any[row] + self.max_cooldown <= now:
+                    self._release(row)
+                    self.expirations += 1
+                slot.discard(row)
+        self._wheel_cursor = max(self._wheel_cursor, second)
 
 
 class ActionableAlertsEngine:
@@ -17,17 +399,70 @@ class ActionableAlertsEngine:
     # Cooldown per worker/machine to avoid alert spam (seconds)
     COOLDOWN_SECONDS = 30
 
-    def __init__(self):
-        self._last_alert_time = {}  # key -> timestamp
+    # Upper bound on entities tracked by the cooldown table
+    MAX_TRACKED_ENTITIES = 50000
+
+    def __init__(self, rules=ALERT_RULES, clock=None, max_entities=MAX_TRACKED_ENTITIES, sample_period=1.0,
+                 site_id="site"):
+        """sample_period: seconds between observations (one simulation tick);
+        converts rule windows in seconds to rolling-window lengths in samples.
+        site_id: prefix of recommendation IDs."""
+        self._clock = clock or SYSTEM_CLOCK
+        self._id_prefix = f"rec-{site_id}-{int(self._clock.time() * 1000):013d}"
+        self._seq = itertools.count(1)
+        self.rules = tuple(rules)
+        self.sample_period = sample_period
+        self._compiled = self._compile(self.rules)
+        max_cooldown = max((self._cooldown(r) for r in self.rules), default=self.COOLDOWN_SECONDS)
+        self._cooldowns = CooldownTable(len(self.rules), max_cooldown, max_entities=max_entities)
+        self._streams = {t: _TargetStream(self._compiled[t], sample_period, max_rows=max_entities)
+                         for t in TARGET_TYPES}
+        # Entities that breached a rule or have a sustained timer running at the last
+        # evaluation; incremental evaluation keeps re-checking them until they clear
+        self._watch = {t: set() for t in TARGET_TYPES}
+
+    def _cooldown(self, rule):
+        return self.COOLDOWN_SECONDS if rule.cooldown is None else rule.cooldown
 
-    def _can_alert(self, key):
-        """Check if enough time has passed since the last alert for this key."""
-        now = time.time()
-        last = self._last_alert_time.get(key, 0)
-        if now - last < self.COOLDOWN_SECONDS:
-            return False
-        self._last_alert_time[key] = now
-        return True
+    def _compile(self, rules):
+        """Group rules by target type and resolve comparators to NumPy ufuncs.
+        Each entry is (rule, ufunc, rule index into the cooldown table)."""
+        compiled = {t: [] for t in TARGET_TYPES}
+        for index, rule in enumerate(rules):
+            if rule.comparator not in COMPARATORS:
+                raise ValueError(f"Unknown comparator {rule.comparator!r} in rule {rule.rule_id}")
+            if rule.kind not in RULE_KINDS:
+                raise ValueError(f"Unknown rule kind {rule.kind!r} in rule {rule.rule_id}")
+            if rule.kind in WINDOW_KINDS + ("sustained",) and not rule.window:
+                raise ValueError(f"Rule {rule.rule_id} of kind {rule.kind!r} needs a window")
+            if rule.kind == "hysteresis" and rule.exit_threshold is None:
+                raise ValueError(f"Hysteresis rule {rule.rule_id} needs an exit_threshold")
+            compiled[rule.target_type].append((rule, COMPARATORS[rule.comparator], index))
+        return compiled
+
+    def metrics(self, target_type):
+        """Metric columns the compiled rules read for a target type."""
+        return sorted({rule.metric for rule, _, _ in self._compiled[target_type]})
+
+    def alert_levels(self, target_type):
+        """
+        {metric: sorted thresholds} of every non-window rule for a target type.
+        Threshold, sustained and hysteresis rules can only change state when
+        their metric crosses one of these levels; Machine / Worker use them to
+        raise the dirty flags that drive evaluate_incremental().
+        """
+        levels = {}
+        for rule, _, _ in self._compiled[target_type]:
+            if rule.kind not in WINDOW_KINDS:
+                marks = levels.setdefault(rule.metric, set())
+                marks.add(rule.threshold)
+                if rule.exit_threshold is not None:
+                    marks.add(rule.exit_threshold)
+        return {metric: tuple(sorted(marks)) for metric, marks in levels.items()}
+
+    def window_metrics(self, target_type):
+        """Metric columns rolling-window rules must sample for every entity every tick."""
+        return sorted({rule.metric for rule, _, _ in self._compiled[target_type] if rule.kind in WINDOW_KINDS})
 
     def evaluate(self, worker_data, machine_data, env_data):
         """
@@ -51,122 +486,202 @@ class ActionableAlertsEngine:
                 - action: recommended supervisor action
                 - message: human-readable summary
         """
+        self._cooldowns.expire(self._clock.time())
         recommendations = []
+        for target_type, data in (("worker", worker_data), ("machine", machine_data), ("site", {"site": env_data})):
+            ids = list(data)
+            rows = list(data.values())
+            columns = self._columns(target_type, rows)
+            stream_rows = self._observe(target_type, ids, columns)
+            self._watch[target_type] = set()
+            recommendations.extend(self._evaluate_target(target_type, ids, columns, rows, stream_rows,
+                                                         self._watch[target_type]))
+        return recommendations
 
-        # ── Worker Rules ──
-        for wid, w in worker_data.items():
-            # Rule 1: Critical CIS Score → Assign Break
-            if w.get("cis_score", 0) >= 0.80 and self._can_alert(f"{wid}_cis_crit"):
-                recommendations.append(self._make_rec(
-                    severity="CRITICAL",
-                    target_type="worker", target_id=wid,
-                    metric="cis_score", value=w["cis_score"], threshold=0.80,
-                    action="ASSIGN 15-MIN MANDATORY BREAK",
-                    message=f"Worker {wid}: CIS Score {w['cis_score']:.2f} – immediate rest required.",
-                ))
-
-            # Rule 2: Warning CIS Score → Monitor Closely
-            elif w.get("cis_score", 0) >= 0.55 and self._can_alert(f"{wid}_cis_warn"):
-                recommendations.append(self._make_rec(
-                    severity="WARNING",
-                    target_type="worker", target_id=wid,
-                    metric="cis_score", value=w["cis_score"], threshold=0.55,
-                    action="SCHEDULE BREAK WITHIN 30 MINUTES",
-                    message=f"Worker {wid}: CIS Score rising ({w['cis_score']:.2f}) – schedule rest.",
-                ))
-
-            # Rule 3: High Heart Rate
-            if w.get("heart_rate_bpm", 0) >= 130 and self._can_alert(f"{wid}_hr"):
-                recommendations.append(self._make_rec(
-                    severity="CRITICAL",
-                    target_type="worker", target_id=wid,
-                    metric="heart_rate_bpm", value=w["heart_rate_bpm"], threshold=130,
-                    action="REMOVE FROM ACTIVE DUTY IMMEDIATELY",
-                    message=f"Worker {wid}: Heart rate {w['heart_rate_bpm']} BPM – cardiac stress risk.",
-                ))
-
-            # Rule 4: High Fatigue
-            if w.get("fatigue_percent", 0) >= 70 and self._can_alert(f"{wid}_fatigue"):
-                recommendations.append(self._make_rec(
-                    severity="WARNING",
-                    target_type="worker", target_id=wid,
-                    metric="fatigue_percent", value=w["fatigue_percent"], threshold=70,
-                    action="ROTATE TO LIGHTER DUTIES",
-                    message=f"Worker {wid}: Fatigue at {w['fatigue_percent']}% – reassign to lighter tasks.",
-                ))
-
-        # ── Machine Rules ──
-        for mid, m in machine_data.items():
-            # Rule 5: High Vibration → Cap Load
-            if m.get("vibration_mm_s", 0) >= 8.0 and self._can_alert(f"{mid}_vib"):
-                recommendations.append(self._make_rec(
-                    severity="WARNING",
-                    target_type="machine", target_id=mid,
-                    metric="vibration_mm_s", value=m["vibration_mm_s"], threshold=8.0,
-                    action="CAP ENGINE LOAD TO 50%",
-                    message=f"Machine {mid}: Vibration {m['vibration_mm_s']} mm/s – reduce load to prevent bearing damage.",
-                ))
-
-            # Rule 6: Overheating → Idle Cooldown
-            if m.get("coolant_temp", 0) >= 95.0 and self._can_alert(f"{mid}_temp"):
-                recommendations.append(self._make_rec(
-                    severity="CRITICAL",
-                    target_type="machine", target_id=mid,
-                    metric="coolant_temp", value=m["coolant_temp"], threshold=95.0,
-                    action="SWITCH TO IDLE – COOLDOWN REQUIRED",
-                    message=f"Machine {mid}: Coolant temp {m['coolant_temp']}°C – overheat risk.",
-                ))
-
-            # Rule 7: High Stress Index
-            if m.get("stress_index", 0) >= 70.0 and self._can_alert(f"{mid}_stress"):
-                recommendations.append(self._make_rec(
-                    severity="WARNING",
-                    target_type="machine", target_id=mid,
-                    metric="stress_index", value=m["stress_index"], threshold=70.0,
-                    action="REDUCE OPERATING INTENSITY",
-                    message=f"Machine {mid}: Stress index {m['stress_index']}% – sustained damage risk.",
-                ))
-
-        # ── Environmental Rules ──
-        ambient = env_data.get("ambient_temp_c", 30)
-        humidity = env_data.get("humidity_pct", 50)
-
-        # Rule 8: Heatwave → Increase Hydration Breaks
-        if ambient >= 40.0 and self._can_alert("site_heat"):
-            recommendations.append(self._make_rec(
-                severity="WARNING",
-                target_type="site", target_id="site",
-                metric="ambient_temp_c", value=ambient, threshold=40.0,
-                action="INCREASE HYDRATION BREAKS TO EVERY 30 MIN",
-                message=f"Site ambient temperature {ambient}°C – heat stress protocol required.",
-            ))
+    def evaluate_incremental(self, worker_data, machine_data, env_data, dirty_workers=(), dirty_machines=()):
+        """
+        Per-tick evaluation over only the entities whose alert metrics crossed
+        an alert level (dirty), that were still breaching, or that are timing a
+        sustained rule. Threshold checks, sustained timers and hysteresis
+        latches cannot change state without such a crossing, so they advance on
+        that subset; rolling windows need every sample and are fed for all
+        entities, from their metrics alone. Produces the same alerts as calling
+        evaluate() every tick.
 
-        # Rule 9: Extreme Heat → Suspend Outdoor Work
-        if ambient >= 46.0 and self._can_alert("site_extreme_heat"):
-            recommendations.append(self._make_rec(
-                severity="CRITICAL",
-                target_type="site", target_id="site",
-                metric="ambient_temp_c", value=ambient, threshold=46.0,
-                action="SUSPEND ALL OUTDOOR OPERATIONS",
-                message=f"EXTREME HEAT: {ambient}°C – cease outdoor work immediately.",
-            ))
+        Args:
+            worker_data, machine_data, env_data: as for evaluate()
+            dirty_workers, dirty_machines: IDs whose alert metrics crossed one of
+                self.alert_levels() since they were last evaluated
+                (see Machine.dirty / Worker.dirty)
+        """
+        self._cooldowns.expire(self._clock.time())
+        recommendations = []
+        for target_type, data, dirty in (("worker", worker_data, dirty_workers),
+                                         ("machine", machine_data, dirty_machines),
+                                         ("site", {"site": env_data}, ("site",))):
+            candidates = dict.fromkeys(itertools.chain(self._watch[target_type], dirty))
+            window_metrics = self.window_metrics(target_type)
+            if window_metrics:
+                all_ids = list(data)
+                stream_rows = self._observe(target_type, all_ids,
+                                            self._columns(target_type, data.values(), window_metrics),
+                                            states=False)
+                now = self._clock.time()
+                for rule, compare, rule_index in self._compiled[target_type]:
+                    if rule.kind in WINDOW_KINDS:
+                        breached, _ = self._signal(target_type, rule, compare, rule_index, None, stream_rows, now)
+                        candidates.update(dict.fromkeys(all_ids[i] for i in np.flatnonzero(breached).tolist()))
+            ids = [eid for eid in candidates if eid in data]
+            # Stream rows follow first-seen (fleet) order, so sorting by them keeps
+            # the alert order of a full evaluate() (until rows are recycled at capacity)
+            sub_rows = self._streams[target_type].rows(ids)
+            order = np.argsort(sub_rows, kind="stable")
+            ids = [ids[i] for i in order.tolist()]
+            rows = [data[eid] for eid in ids]
+            columns = self._columns(target_type, rows)
+            self._observe(target_type, ids, columns, windows=False)
+            self._watch[target_type] = set()
+            recommendations.extend(self._evaluate_target(target_type, ids, columns, rows, sub_rows[order],
+                                                         self._watch[target_type]))
+        return recommendations
+
+    def observe(self, worker_data, machine_data, env_data):
+        """
+        Feed one sample per entity into the streaming rule state without
+        evaluating. Call on ticks where evaluate() is skipped so windows,
+        sustained timers and hysteresis latches see every sample.
+        """
+        for target_type, data in (("worker", worker_data), ("machine", machine_data), ("site", {"site": env_data})):
+            self._observe(target_type, list(data), self._columns(target_type, list(data.values())))
 
-        # Rule 10: High Humidity → Fatigue Warning
-        if humidity >= 80.0 and self._can_alert("site_humidity"):
+    def observe_columns(self, target_type, ids, columns):
+        """Columnar counterpart of observe() for one target type."""
+        columns = {m: np.asarray(columns[m], dtype=np.float64) for m in self.metrics(target_type)}
+        self._observe(target_type, list(ids), columns)
+
+    def evaluate_columns(self, target_type, ids, columns):
+        """
+        Evaluate the rules for one target type directly over columnar arrays
+        (e.g. WorkerFleet / MachineFleet state) without building per-entity dicts.
+
+        Args:
+            target_type: "worker" | "machine" | "site"
+            ids: sequence of entity IDs, aligned with the arrays
+            columns: dict of {metric: array} covering self.metrics(target_type)
+        """
+        self._cooldowns.expire(self._clock.time())
+        ids = list(ids)
+        columns = {m: np.asarray(columns[m], dtype=np.float64) for m in self.metrics(target_type)}
+        stream_rows = self._observe(target_type, ids, columns)
+        return self._evaluate_target(target_type, ids, columns, None, stream_rows)
+
+    def _columns(self, target_type, rows, metrics=None):
+        n = len(rows)
+        columns = {}
+        for metric in (self.metrics(target_type) if metrics is None else metrics):
+            # map(dict.get, ...) keeps the per-row lookup in C
+            getter = map(dict.get, rows, itertools.repeat(metric), itertools.repeat(METRIC_DEFAULTS.get(metric, 0)))
+            columns[metric] = np.fromiter(getter, dtype=np.float64, count=n)
+        return columns
+
+    def _observe(self, target_type, ids, columns, windows=True, states=True):
+        """Push one sample per entity into the rolling windows (`windows`) and
+        advance the sustained / hysteresis state (`states`). O(1) per entity and
+        rule. Returns the stream rows."""
+        stream = self._streams[target_type]
+        if not ids:
+            return np.zeros(0, dtype=np.int64)
+        now = self._clock.time()
+        rows = stream.rows(ids)
+        if windows:
+            for (metric, _), window in stream.windows.items():
+                window.push(rows, columns[metric])
+        for rule, compare, index in self._compiled[target_type] if states else ():
+            if rule.kind == "sustained":
+                holding = compare(columns[rule.metric], rule.threshold)
+                since = stream.since[index][rows]
+                stream.since[index][rows] = np.where(holding, np.where(np.isnan(since), now, since), np.nan)
+            elif rule.kind == "hysteresis":
+                values = columns[rule.metric]
+                latched = stream.latched[index][rows]
+                stream.latched[index][rows] = np.where(latched, compare(values, rule.exit_threshold),
+                                                       compare(values, rule.threshold))
+        return rows
+
+    def _signal(self, target_type, rule, compare, rule_index, columns, stream_rows, now):
+        """(breached mask, reported values or None for the current sample) for one rule."""
+        stream = self._streams[target_type]
+        if rule.kind == "threshold":
+            return compare(columns[rule.metric], rule.threshold), None
+        if rule.kind == "sustained":
+            return now - stream.since[rule_index][stream_rows] >= rule.window - 1e-9, None
+        if rule.kind == "hysteresis":
+            return stream.latched[rule_index][stream_rows], None
+        size = max(1, int(round(rule.window / self.sample_period)))
+        window = stream.windows[(rule.metric, size)]
+        if rule.kind == "mean":
+            values = window.mean(stream_rows)
+        elif rule.kind == "max":
+            values = window.max(stream_rows)
+        else:
+            values = window.rate(stream_rows, self.sample_period)
+        with np.errstate(invalid="ignore"):
+            return compare(values, rule.threshold), values
+
+    def _evaluate_target(self, target_type, ids, columns, rows, stream_rows, watch=None):
+        """Vectorized threshold checks; cooldown filtering only on breaching entities.
+        If `watch` is given, it receives the IDs still breaching or timing a sustained rule."""
+        n = len(ids)
+        if n == 0:
+            return []
+        now = self._clock.time()
+        pending = np.zeros(n, dtype=bool)
+        fired = {}  # rule_id → bool mask of entities that fired this evaluation
+        hits = []   # (entity index, rule order, rule, aggregate values or None)
+        for order, (rule, compare, rule_index) in enumerate(self._compiled[target_type]):
+            breached, aggregates = self._signal(target_type, rule, compare, rule_index, columns, stream_rows, now)
+            pending |= breached
+            if rule.kind == "sustained":
+                pending |= ~np.isnan(self._streams[target_type].since[rule_index][stream_rows])
+            if rule.else_of:
+                breached &= ~fired[rule.else_of]
+            mask = np.zeros(n, dtype=bool)
+            candidates = np.flatnonzero(breached)
+            if len(candidates):
+                ok = self._cooldowns.allow([ids[i] for i in candidates.tolist()], rule_index, now,
+                                           self._cooldown(rule))
+                mask[candidates[ok]] = True
+                hits.extend((i, order, rule, aggregates) for i in candidates[ok].tolist())
+            fired[rule.rule_id] = mask
+
+        if watch is not None:
+            watch.update(ids[i] for i in np.flatnonzero(pending).tolist())
+
+        # Same ordering as per-entity evaluation: entity first, then rule order
+        hits.sort(key=lambda h: (h[0], h[1]))
+        recommendations = []
+        for i, _, rule, aggregates in hits:
+            target_id = ids[i]
+            if aggregates is not None:
+                value = aggregates[i].item()
+            elif rows is not None:
+                value = rows[i].get(rule.metric, METRIC_DEFAULTS.get(rule.metric, 0))
+            else:
+                value = columns[rule.metric][i].item()
             recommendations.append(self._make_rec(
-                severity="INFO",
-                target_type="site", target_id="site",
-                metric="humidity_pct", value=humidity, threshold=80.0,
-                action="MONITOR WORKERS FOR HEAT EXHAUSTION",
-                message=f"Site humidity {humidity}% – increased fatigue risk for all workers.",
+                severity=rule.severity,
+                target_type=target_type, target_id=target_id,
+                metric=rule.metric, value=value, threshold=rule.threshold,
+                action=rule.action,
+                message=rule.message.format(id=target_id, value=value),
             ))
-
         return recommendations
 
     def _make_rec(self, severity, target_type, target_id, metric, value, threshold, action, message):
+        now = self._clock.time()
         return {
-            "id": f"rec-{int(time.time() * 1000)}",
-            "timestamp": time.time() * 1000,
+            "id": f"{self._id_prefix}-{next(self._seq):08d}",
+            "timestamp": now * 1000,
             "severity": severity,
             "target_type": target_type,
             "target_id": target_id,
@@ -176,3 +691,63 @@ class ActionableAlertsEngine:
             "action": action,
             "message": message,
         }
+
+
+# ─────────────────────────────────────────────────
+# Incremental Alert Log
+# ─────────────────────────────────────────────────
+
+class AlertLog:
+    """
+    Publishes recommendations as an append-only map keyed by alert ID.
+
+    Each publish() stages one multi-path update under `path` on a
+    DeltaPublisher (as one-shot writes, so it goes out with the tick's flush
+    and is retried if lost) that adds the new alerts and deletes the ones past
+    their TTL (or beyond max_live, oldest first), so already-delivered alerts
+    are never re-sent. Writing the same alert twice is idempotent since its
+    path is its ID.
+    """
+
+    def __init__(self, publisher, path="recommendations", clock=None, ttl=ALERT_TTL_SECONDS,
+                 max_live=ALERT_LOG_MAX):
+        self.publisher = publisher
+        self.path = path
+        self._clock = clock or SYSTEM_CLOCK
+        self.ttl = ttl
+        self.max_live = max_live
+        self._live = deque()  # (expires_at, alert id), in emission order
+        self.last_id = None
+        self.appended = 0
+        self.retired = 0
+        # The first publish() starts from an empty log, so alerts from earlier
+        # runs are not left un-retired (no write happens at construction)
+        self._reset = True
+
+    def publish(self, recs):
+        """Append new recommendations and retire expired ones. Returns the update staged (or {})."""
+        now = self._clock.time()
+        updates = {}
+        for rec in recs:
+            updates[f"alerts/{rec['id']}"] = rec
+            self._live.append((now + self.ttl, rec["id"]))
+            self.last_id = rec["id"]
+        self.appended += len(recs)
+
+        while self._live and (self._live[0][0] <= now or len(self._live) > self.max_live):
+            _, alert_id = self._live.popleft()
+            updates[f"alerts/{alert_id}"] = None
+            self.retired += 1
+
+        if not updates and not self._reset:
+            return {}
+        updates["count"] = len(self._live)
+        updates["last_id"] = self.last_id
+        updates["timestamp"] = now * 1000
+        if self._reset:
+            # Clear the whole log in this same update: the writes below fold into the reset node
+            self.publisher.stage_once(self.path, None)
+            self._reset = False
+        for key, value in updates.items():
+            self.publisher.stage_once(f"{self.path}/{key}", value)
+        return updates
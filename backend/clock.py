@@ -0,0 +1,41 @@
+"""
+Simulation Clocks
+==================
+Every time-dependent component (entity timestamps, escalation ramps, alert
+cooldowns, command expiry) reads time through a clock object instead of
+calling time.time() directly, so the same code can run in real time or
+fast-forward through a simulated day in seconds.
+"""
+
+import time
+
+
+class SystemClock:
+    """Wall-clock time; sleep() really blocks."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class SimulatedClock:
+    """Manually advanced clock for headless runs; sleep() advances instantly."""
+
+    def __init__(self, start=None):
+        self._now = time.time() if start is None else float(start)
+
+    def time(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self._now += seconds
+
+
+SYSTEM_CLOCK = SystemClock()
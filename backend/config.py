@@ -7,6 +7,12 @@ FIREBASE_CREDENTIALS_PATH = os.environ.get('FIREBASE_CREDENTIALS_PATH', 'service
 # Realtime Database URL
 FIREBASE_DB_URL = os.environ.get('FIREBASE_DB_URL', 'https://harmony-aura-default-rtdb.firebaseio.com/')
 
+# Telemetry sink backend: "firebase", "memory", "file" or "http" (see sinks.py)
+SINK_BACKEND = os.environ.get('SINK_BACKEND', 'firebase')
+SINK_FILE_PATH = os.environ.get('SINK_FILE_PATH', 'telemetry.jsonl')
+SINK_HTTP_HOST = os.environ.get('SINK_HTTP_HOST', '127.0.0.1')
+SINK_HTTP_PORT = int(os.environ.get('SINK_HTTP_PORT', '8765'))
+
 # Simulation Settings
 SIMULATION_FREQUENCY = 1.0  # Hz (1 update per second)
 NUM_WORKERS = 10
@@ -14,3 +20,38 @@ NUM_MACHINES = 5
 
 # Machine Constants
 MACHINE_TYPES = ['Excavator', 'Bulldozer', 'Crane', 'Loader', 'Truck']
+
+# Publishing: minimum change before a numeric field is re-sent to Firebase
+PUBLISH_DEADBANDS = {
+    "coolant_temp": 0.1,
+    "engine_load": 0.2,
+    "engine_rpm": 5,
+    "hydraulic_pressure": 20,
+    "oil_pressure": 0.2,
+    "fuel_level": 0.1,
+    "vibration_mm_s": 0.1,
+    "prediction_age": 10,  # PdM cache age (readings); republish growth at most every 10
+}
+# Deadband fields that count up and reset: decreases bypass the deadband, so a
+# fresh prediction's age of 0 is never held back behind a stale published age
+PUBLISH_RESET_FIELDS = ("prediction_age",)
+
+# Background publisher queue (overflow policy: "coalesce" or "drop_oldest")
+PUBLISH_QUEUE_SIZE = 32
+PUBLISH_OVERFLOW_POLICY = "coalesce"
+PUBLISH_STATS_INTERVAL = 60  # ticks between publisher stats lines
+
+# Alert log: live recommendations are retired after ALERT_TTL_SECONDS, oldest
+# first once more than ALERT_LOG_MAX are live
+ALERT_TTL_SECONDS = 300
+ALERT_LOG_MAX = 200
+
+# Alert evaluation: "incremental" checks only changed entities every tick,
+# "full" scans every entity every ALERT_EVAL_INTERVAL ticks
+ALERT_MODE = os.environ.get('ALERT_MODE', 'incremental')
+ALERT_EVAL_INTERVAL = 5
+
+# Opt-in streaming variants of the default alert rules (None = plain threshold / rule disabled)
+ALERT_HR_EXIT_BPM = None            # e.g. 120: HR alert stays latched until HR falls below this
+ALERT_STRESS_SUSTAIN_S = None       # e.g. 10: stress index must stay high this long before alerting
+ALERT_COOLANT_RISE_C_PER_S = None   # e.g. 0.5: alert on coolant rising this fast over 30 s
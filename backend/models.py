@@ -12,8 +12,24 @@ Design principles:
 """
 
 import random
-import time
 import math
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from clock import SYSTEM_CLOCK
+
+
+def _crossed(state, clean, alert_levels):
+    """True if a tracked field crossed (or touched) one of its alert levels since the clean snapshot."""
+    for field, levels in alert_levels.items():
+        if field not in clean:
+            return True
+        new, old = state[field], clean[field]
+        if new != old and (bisect_left(levels, new) != bisect_left(levels, old)
+                           or bisect_right(levels, new) != bisect_right(levels, old)):
+            return True
+    return False
 
 
 # ─────────────────────────────────────────────────
@@ -64,9 +80,10 @@ MACHINE_PROFILES = {
 
 
 class Machine:
-    def __init__(self, machine_id, machine_type):
+    def __init__(self, machine_id, machine_type, clock=None, alert_levels=None):
         self.machine_id = machine_id
         self.machine_type = machine_type
+        self._clock = clock or SYSTEM_CLOCK
 
         # Get type-specific profile (with fallback)
         profile = MACHINE_PROFILES.get(machine_type, MACHINE_PROFILES["Truck"])
@@ -89,7 +106,14 @@ class Machine:
         self.vibration = profile["vibration_base"]
         self.fault_codes = []
         self.operating_mode = "IDLE"
-        self.timestamp = time.time()
+        self.timestamp = self._clock.time()
+
+        # Alert dirty flag: set when an alert metric crosses one of its levels
+        # ({field: sorted thresholds}); None = untracked, always dirty
+        self.alert_levels = alert_levels
+        self.dirty = True
+        self._state = {}
+        self._clean = {}
 
         # Noise state (Ornstein-Uhlenbeck process)
         self._rpm_noise = 0.0
@@ -101,7 +125,7 @@ class Machine:
         return current * (1 - mean_reversion) + self._rng.gauss(0, volatility)
 
     def update(self, escalation_factor=0.0, ambient_temp=30.0, cooling_efficiency=1.0, load_cap=None):
-        self.timestamp = time.time()
+        self.timestamp = self._clock.time()
         p = self.profile
         v = self._variance
 
@@ -181,7 +205,15 @@ class Machine:
         # --- Fuel consumption ---
         self.fuel_level = max(0, self.fuel_level - (self.engine_load / 100) * 0.003 * v)
 
-        return self.to_dict()
+        self._state = self.to_dict()
+        if not self.dirty:
+            self.dirty = self.alert_levels is None or _crossed(self._state, self._clean, self.alert_levels)
+        return self._state
+
+    def mark_clean(self):
+        """Remember the state just evaluated (a fresh dict per update) and clear the dirty flag."""
+        self._clean = self._state
+        self.dirty = False
 
     def reset(self):
         """Hard reset to safe idle baseline."""
@@ -196,6 +228,7 @@ class Machine:
         self.stress_index = 0.0
         self.vibration = p["vibration_base"]
         self.fault_codes = []
+        self.dirty = True
         self._rpm_noise = 0.0
         self._load_noise = 0.0
         self._temp_noise = 0.0
@@ -219,6 +252,190 @@ class Machine:
         }
 
 
+# ─────────────────────────────────────────────────
+# Vectorized Machine Fleet (structure-of-arrays)
+# ─────────────────────────────────────────────────
+# Same physics as Machine.update, but every machine's state lives in NumPy
+# arrays and the whole fleet advances in one vectorized step. One fleet-wide
+# Generator replaces the per-instance random.Random, so individual traces are
+# statistically equivalent to Machine but not sample-for-sample identical.
+
+MACHINE_MODES = ("IDLE", "WORKING", "HIGH_LOAD")
+_IDLE, _WORKING, _HIGH_LOAD = range(len(MACHINE_MODES))
+
+
+class MachineFleet:
+    """Vectorized simulation engine for thousands of machines per tick."""
+
+    def __init__(self, machine_ids, machine_types, seed=None, clock=None):
+        self.machine_ids = list(machine_ids)
+        self._clock = clock or SYSTEM_CLOCK
+        self.machine_types = list(machine_types)
+        self.index = {mid: i for i, mid in enumerate(self.machine_ids)}
+        n = len(self.machine_ids)
+        self.size = n
+        self._rng = np.random.default_rng(seed)
+
+        # Per-machine copies of the type profile (with fallback)
+        profiles = [MACHINE_PROFILES.get(t, MACHINE_PROFILES["Truck"]) for t in self.machine_types]
+
+        def col(key):
+            return np.array([p[key] for p in profiles], dtype=np.float64)
+
+        # Manufacturing variance (±8%) baked into the mode target tables
+        self._variance = self._rng.uniform(0.92, 1.08, n)
+        self._rpm_targets = np.stack([col("idle_rpm"), col("work_rpm"), col("peak_rpm")], axis=1) * self._variance[:, None]
+        self._load_targets = np.stack([col("idle_load"), col("work_load"), col("peak_load")], axis=1) * self._variance[:, None]
+        self._work_rpm = col("work_rpm")
+        self._idle_temp = col("idle_temp")
+        self._responsiveness = col("load_responsiveness")
+        self._vibration_base = col("vibration_base")
+        self._rows = np.arange(n)
+
+        # State
+        self.engine_rpm = self._rpm_targets[:, _IDLE].copy()
+        self.engine_load = self._load_targets[:, _IDLE].copy()
+        self.coolant_temp = self._idle_temp + self._rng.uniform(-2, 2, n)
+        self.oil_pressure = 22.0 + self._rng.uniform(-3, 3, n)
+        self.hydraulic_pressure = np.full(n, 300.0)
+        self.fuel_level = np.full(n, 100.0)
+        self.degradation = self._rng.uniform(0, 0.005, n)  # Pre-existing wear
+        self.stress_index = np.zeros(n)
+        self.vibration = self._vibration_base.copy()
+        self.mode = np.full(n, _IDLE, dtype=np.int8)
+        self.timestamp = self._clock.time()
+
+        # Noise state (Ornstein-Uhlenbeck process)
+        self._rpm_noise = np.zeros(n)
+        self._load_noise = np.zeros(n)
+        self._temp_noise = np.zeros(n)
+
+    def _ou_step(self, current, mean_reversion=0.3, volatility=1.0):
+        """Vectorized Ornstein-Uhlenbeck step over the whole fleet."""
+        return current * (1 - mean_reversion) + self._rng.normal(0, volatility, self.size)
+
+    def update(self, escalation_factor=0.0, ambient_temp=30.0, cooling_efficiency=1.0, load_cap=None):
+        """Advance every machine by one tick.
+
+        escalation_factor and load_cap may be scalars or per-machine arrays;
+        NaN entries in a load_cap array mean "no cap" for that machine.
+        """
+        self.timestamp = self._clock.time()
+        n = self.size
+        v = self._variance
+        esc = np.broadcast_to(np.asarray(escalation_factor, dtype=np.float64), (n,))
+        if load_cap is None:
+            cap = np.full(n, np.nan)
+        else:
+            cap = np.broadcast_to(np.asarray(load_cap, dtype=np.float64), (n,))
+        capped = ~np.isnan(cap)
+
+        # --- Mode selection: supervisor override > escalation > random cycling ---
+        toggled = np.where(self.mode == _IDLE, _WORKING, _IDLE)
+        cycled = np.where(self._rng.random(n) < 0.03, toggled, self.mode)
+        mode = np.where(esc > 0.1, _WORKING, cycled)
+        mode = np.where(esc > 0.5, _HIGH_LOAD, mode)
+        mode = np.where(capped & (cap <= 10), _IDLE, mode)
+        self.mode = mode.astype(np.int8)
+
+        # --- Target Values by Mode ---
+        target_rpm = self._rpm_targets[self._rows, self.mode]
+        target_load = np.minimum(self._load_targets[self._rows, self.mode] + 20 * esc, 100)
+
+        # --- Supervisor Override: cap load ---
+        target_load = np.where(capped, np.fmin(target_load, cap), target_load)
+        target_rpm = np.where(capped, np.minimum(target_rpm, self._work_rpm * 0.7), target_rpm)
+
+        # --- Smooth Transitions with Type-Specific Inertia ---
+        resp = self._responsiveness
+        self.engine_rpm += (target_rpm - self.engine_rpm) * resp
+        self.engine_load += (target_load - self.engine_load) * resp
+
+        # --- Physics-based Thermal Balance ---
+        heat_gen = (self.engine_load / 100) * 1.2 + esc * 0.8
+        heat_loss = (self.coolant_temp - ambient_temp) * 0.025 * cooling_efficiency
+        self.coolant_temp += heat_gen - heat_loss
+
+        # --- Add Sensor Noise (Ornstein-Uhlenbeck) ---
+        self._rpm_noise = self._ou_step(self._rpm_noise, 0.3, 8.0)
+        self._load_noise = self._ou_step(self._load_noise, 0.4, 0.8)
+        self._temp_noise = self._ou_step(self._temp_noise, 0.2, 0.3)
+
+        self.engine_rpm += self._rpm_noise
+        self.engine_load += self._load_noise
+        self.coolant_temp += self._temp_noise
+
+        # Clamp
+        np.clip(self.engine_load, 0, 100, out=self.engine_load)
+        np.clip(self.coolant_temp, 20, 130, out=self.coolant_temp)
+
+        # --- Derived Values ---
+        load_frac = self.engine_load / 100
+        self.oil_pressure = np.maximum(0, (self.engine_rpm / 2500) * 55 - 8 * esc + self._rng.uniform(-0.5, 0.5, n))
+        self.hydraulic_pressure = load_frac * 3000 + self._rng.uniform(-20, 20, n)
+        self.vibration = self._vibration_base + load_frac * 4.0 + esc * 3.0 + self._rng.uniform(-0.2, 0.2, n)
+
+        # --- Stress Index ---
+        stress_raw = (load_frac * 0.5 + (self.coolant_temp / 100) * 0.3 + esc * 0.2) * 100
+        self.stress_index = np.clip(stress_raw, 0, 100)
+
+        # --- Degradation (cumulative) ---
+        self.degradation += (self.stress_index / 100) * 0.00005 * v
+
+        # --- Fuel consumption ---
+        self.fuel_level = np.maximum(0, self.fuel_level - load_frac * 0.003 * v)
+
+    def reset(self, mask=None):
+        """Hard reset machines (all, or those selected by a boolean mask) to safe idle baseline."""
+        if mask is None:
+            mask = np.ones(self.size, dtype=bool)
+        k = int(mask.sum())
+        self.mode[mask] = _IDLE
+        self.engine_rpm[mask] = self._rpm_targets[mask, _IDLE]
+        self.engine_load[mask] = self._load_targets[mask, _IDLE]
+        self.coolant_temp[mask] = self._idle_temp[mask] + self._rng.uniform(-1, 1, k)
+        self.oil_pressure[mask] = 22.0 + self._rng.uniform(-2, 2, k)
+        self.hydraulic_pressure[mask] = 300
+        self.stress_index[mask] = 0.0
+        self.vibration[mask] = self._vibration_base[mask]
+        self._rpm_noise[mask] = 0.0
+        self._load_noise[mask] = 0.0
+        self._temp_noise[mask] = 0.0
+
+    def to_dict(self, machine_id):
+        """Per-machine dict in the same format as Machine.to_dict()."""
+        i = self.index[machine_id]
+        return self._row_dict(i, self.engine_rpm[i], self.engine_load[i], self.coolant_temp[i],
+                              self.oil_pressure[i], self.hydraulic_pressure[i], self.fuel_level[i],
+                              self.degradation[i], self.stress_index[i], self.vibration[i], self.mode[i])
+
+    def to_dicts(self):
+        """Return {machine_id: dict} for the whole fleet (one tolist() per column)."""
+        cols = zip(self.engine_rpm.tolist(), self.engine_load.tolist(), self.coolant_temp.tolist(),
+                   self.oil_pressure.tolist(), self.hydraulic_pressure.tolist(), self.fuel_level.tolist(),
+                   self.degradation.tolist(), self.stress_index.tolist(), self.vibration.tolist(),
+                   self.mode.tolist())
+        return {mid: self._row_dict(i, *row) for i, (mid, row) in enumerate(zip(self.machine_ids, cols))}
+
+    def _row_dict(self, i, rpm, load, temp, oil, hyd, fuel, deg, stress, vib, mode):
+        return {
+            "machine_id": self.machine_ids[i],
+            "machine_type": self.machine_types[i],
+            "engine_rpm": round(float(rpm)),
+            "engine_load": round(float(load), 1),
+            "coolant_temp": round(float(temp), 1),
+            "oil_pressure": round(float(oil), 1),
+            "hydraulic_pressure": round(float(hyd)),
+            "fuel_level": round(float(fuel), 1),
+            "degradation": round(float(deg), 4),
+            "stress_index": round(float(stress), 1),
+            "vibration_mm_s": round(float(vib), 1),
+            "operating_mode": MACHINE_MODES[int(mode)],
+            "fault_codes": [],
+            "timestamp": self.timestamp,
+        }
+
+
 # ─────────────────────────────────────────────────
 # Worker Physiological DNA Profiles
 # ─────────────────────────────────────────────────
@@ -226,9 +443,10 @@ class Machine:
 # This ensures W1 always behaves like W1, but differently from W2.
 
 class Worker:
-    def __init__(self, worker_id, assigned_machine_id):
+    def __init__(self, worker_id, assigned_machine_id, clock=None, alert_levels=None):
         self.worker_id = worker_id
         self.assigned_machine_id = assigned_machine_id
+        self._clock = clock or SYSTEM_CLOCK
 
         # Deterministic per-worker RNG
         self._rng = random.Random(hash(worker_id + "_bio"))
@@ -252,7 +470,14 @@ class Worker:
         self.stress = 0.0
         self.cis_score = 0.0
         self.cis_risk_level = "Safe"
-        self.timestamp = time.time()
+        self.timestamp = self._clock.time()
+
+        # Alert dirty flag: set when an alert metric crosses one of its levels
+        # ({field: sorted thresholds}); None = untracked, always dirty
+        self.alert_levels = alert_levels
+        self.dirty = True
+        self._state = {}
+        self._clean = {}
 
         # Noise state (OU processes for each sensor)
         self._hr_noise = 0.0
@@ -263,7 +488,7 @@ class Worker:
         return current * (1 - mean_reversion) + self._rng.gauss(0, volatility)
 
     def update(self, machine_stress, escalation_factor=0.0, humidity_factor=1.0, force_break=False):
-        self.timestamp = time.time()
+        self.timestamp = self._clock.time()
 
         # ── Supervisor Override: Mandatory Break ──
         if force_break:
@@ -281,7 +506,7 @@ class Worker:
                 self.cis_risk_level = "Warning"
             else:
                 self.cis_risk_level = "Safe"
-            return self.to_dict()
+            return self._track()
 
         # ── Heart Rate ──
         # Composed of: baseline + machine coupling + escalation + physiological noise
@@ -344,7 +569,19 @@ class Worker:
         else:
             self.cis_risk_level = "Safe"
 
-        return self.to_dict()
+        return self._track()
+
+    def _track(self):
+        """Build the published state and raise the dirty flag if an alert metric crossed a level."""
+        self._state = self.to_dict()
+        if not self.dirty:
+            self.dirty = self.alert_levels is None or _crossed(self._state, self._clean, self.alert_levels)
+        return self._state
+
+    def mark_clean(self):
+        """Remember the state just evaluated (a fresh dict per update) and clear the dirty flag."""
+        self._clean = self._state
+        self.dirty = False
 
     def reset(self):
         """Hard reset to safe personal baseline."""
@@ -354,6 +591,7 @@ class Worker:
         self.stress = 0.0
         self.cis_score = round(self.baseline_fatigue / 250, 2)  # Very low
         self.cis_risk_level = "Safe"
+        self.dirty = True
         self._hr_noise = 0.0
         self._fatigue_noise = 0.0
 
@@ -371,6 +609,163 @@ class Worker:
         }
 
 
+# ─────────────────────────────────────────────────
+# Vectorized Worker Fleet (structure-of-arrays)
+# ─────────────────────────────────────────────────
+# Bio-profiles and physiological state for the whole workforce as NumPy arrays.
+# The force-break, escalation and resting branches of Worker.update become
+# boolean masks, so CIS and risk levels are computed for every wearable at once.
+
+CIS_RISK_LEVELS = ("Safe", "Warning", "Critical")
+
+
+class WorkerFleet:
+    """Vectorized physiological simulation for an entire workforce."""
+
+    def __init__(self, worker_ids, assigned_machine_ids, machine_index, seed=None, clock=None):
+        """
+        Args:
+            worker_ids: sequence of worker IDs
+            assigned_machine_ids: machine ID per worker (same order as worker_ids)
+            machine_index: dict of {machine_id: row} into the machine stress array
+                passed to update() (e.g. MachineFleet.index)
+            seed: optional seed for the fleet-wide Generator
+            clock: time source for timestamps (defaults to wall clock)
+        """
+        self.worker_ids = list(worker_ids)
+        self._clock = clock or SYSTEM_CLOCK
+        self.index = {wid: i for i, wid in enumerate(self.worker_ids)}
+        n = len(self.worker_ids)
+        self.size = n
+        self._rng = np.random.default_rng(seed)
+        self.assign(assigned_machine_ids, machine_index)
+
+        # ── Bio-Profiles ("DNA") — same ranges as Worker ──
+        u = self._rng.uniform
+        self.baseline_hr = u(64, 78, n)
+        self.max_hr = u(160, 195, n)
+        self.hr_reactivity = u(0.03, 0.08, n)
+        self.hr_jitter = u(0.3, 1.5, n)
+        self.fatigue_resistance = u(0.6, 1.4, n)
+        self.recovery_rate = u(0.05, 0.15, n)
+        self.stress_sensitivity = u(0.8, 1.2, n)
+        self.baseline_fatigue = u(1.0, 8.0, n)
+        self.baseline_hrv = u(55, 72, n)
+
+        # State
+        self.heart_rate = self.baseline_hr.copy()
+        self.hrv = self.baseline_hrv.copy()
+        self.fatigue = self.baseline_fatigue.copy()
+        self.stress = np.zeros(n)
+        self.cis_score = np.zeros(n)
+        self.risk = np.zeros(n, dtype=np.int8)  # index into CIS_RISK_LEVELS
+        self.timestamp = self._clock.time()
+
+        # Noise state (OU processes)
+        self._hr_noise = np.zeros(n)
+        self._fatigue_noise = np.zeros(n)
+
+    def assign(self, assigned_machine_ids, machine_index):
+        """(Re)build the worker → machine row index used to gather machine stress."""
+        self.assigned_machine_ids = list(assigned_machine_ids)
+        self.machine_slot = np.array([machine_index[mid] for mid in self.assigned_machine_ids], dtype=np.int64)
+
+    def update(self, machine_stress, escalation_factor=0.0, humidity_factor=1.0, force_break=False):
+        """Advance every worker by one tick.
+
+        Args:
+            machine_stress: per-machine stress array, gathered through machine_slot
+            escalation_factor: scalar or per-worker array
+            humidity_factor: site-wide fatigue multiplier
+            force_break: scalar or per-worker boolean mask (supervisor override)
+        """
+        self.timestamp = self._clock.time()
+        n = self.size
+        m_stress = np.asarray(machine_stress, dtype=np.float64)[self.machine_slot]
+        esc = np.broadcast_to(np.asarray(escalation_factor, dtype=np.float64), (n,))
+        on_break = np.broadcast_to(np.asarray(force_break, dtype=bool), (n,))
+        active = ~on_break
+
+        # ── Heart Rate ──
+        machine_coupling = m_stress * 0.06 * self.stress_sensitivity
+        escalation_drive = (self.max_hr - self.baseline_hr) * esc * 0.55
+        fatigue_drive = self.fatigue * 0.12
+        target_hr = self.baseline_hr + machine_coupling + escalation_drive + fatigue_drive
+
+        self._hr_noise = np.where(
+            active, self._hr_noise * 0.75 + self._rng.normal(0, 1, n) * self.hr_jitter, self._hr_noise)
+        active_hr = self.heart_rate + (target_hr - self.heart_rate) * self.hr_reactivity + self._hr_noise
+        active_hr = np.clip(active_hr, 50, self.max_hr)
+        # Mandatory break: rapidly bring worker to resting state
+        break_hr = self.heart_rate + (self.baseline_hr - self.heart_rate) * 0.15
+        self.heart_rate = np.where(active, active_hr, break_hr)
+
+        # ── HRV ──
+        hr_above_rest = np.maximum(0, self.heart_rate - self.baseline_hr)
+        active_hrv = self.baseline_hrv - hr_above_rest * 0.35 - 20 * esc + self._rng.uniform(-1.5, 1.5, n)
+        self.hrv = np.where(active, np.clip(active_hrv, 8, 90), np.minimum(90, self.hrv + 0.5))
+
+        # ── Fatigue ──
+        escalating = esc > 0
+        gain = 0.6 * esc * self.fatigue_resistance * humidity_factor
+        env_drain = max(0, (humidity_factor - 1.0) * 0.08)
+        recovery = (self.baseline_fatigue - self.fatigue) * self.recovery_rate + env_drain
+        self._fatigue_noise = np.where(
+            active, self._fatigue_noise * 0.8 + self._rng.normal(0, 0.15, n), self._fatigue_noise)
+        active_fatigue = np.clip(self.fatigue + np.where(escalating, gain, recovery) + self._fatigue_noise, 0, 100)
+        self.fatigue = np.where(active, active_fatigue, np.maximum(0, self.fatigue - 0.8))
+
+        # ── Stress ──
+        raw_stress = (hr_above_rest / (self.max_hr - self.baseline_hr)) * 100 * self.stress_sensitivity
+        self.stress = np.where(active, np.clip(raw_stress, 0, 100), np.maximum(0, self.stress - 1.5))
+
+        # ── CIS Score: Fatigue 40%, Stress 30%, Machine Stress 30% ──
+        raw_cis = 0.4 * (self.fatigue / 100) + 0.3 * (self.stress / 100) + 0.3 * (m_stress / 100)
+        self.cis_score = np.round(np.clip(raw_cis, 0, 1.0), 2)
+
+        # ── Risk Level ──
+        self.risk = ((self.cis_score >= 0.40).astype(np.int8) + (self.cis_score >= 0.75)).astype(np.int8)
+
+    def reset(self, mask=None):
+        """Hard reset workers (all, or those selected by a boolean mask) to personal baseline."""
+        if mask is None:
+            mask = np.ones(self.size, dtype=bool)
+        k = int(mask.sum())
+        self.heart_rate[mask] = self.baseline_hr[mask] + self._rng.uniform(-1, 1, k)
+        self.hrv[mask] = self.baseline_hrv[mask] + self._rng.uniform(-2, 2, k)
+        self.fatigue[mask] = self.baseline_fatigue[mask]
+        self.stress[mask] = 0.0
+        self.cis_score[mask] = np.round(self.baseline_fatigue[mask] / 250, 2)
+        self.risk[mask] = 0
+        self._hr_noise[mask] = 0.0
+        self._fatigue_noise[mask] = 0.0
+
+    def to_dict(self, worker_id):
+        """Per-worker dict in the same format as Worker.to_dict()."""
+        i = self.index[worker_id]
+        return self._row_dict(i, self.heart_rate[i], self.hrv[i], self.fatigue[i],
+                              self.stress[i], self.cis_score[i], self.risk[i])
+
+    def to_dicts(self):
+        """Return {worker_id: dict} for the whole workforce (one tolist() per column)."""
+        cols = zip(self.heart_rate.tolist(), self.hrv.tolist(), self.fatigue.tolist(),
+                   self.stress.tolist(), self.cis_score.tolist(), self.risk.tolist())
+        return {wid: self._row_dict(i, *row) for i, (wid, row) in enumerate(zip(self.worker_ids, cols))}
+
+    def _row_dict(self, i, hr, hrv, fatigue, stress, cis, risk):
+        return {
+            "worker_id": self.worker_ids[i],
+            "assigned_machine": self.assigned_machine_ids[i],
+            "heart_rate_bpm": round(float(hr)),
+            "hrv_ms": round(float(hrv)),
+            "fatigue_percent": round(float(fatigue), 1),
+            "stress_percent": round(float(stress), 1),
+            "cis_score": float(cis),
+            "cis_risk_level": CIS_RISK_LEVELS[int(risk)],
+            "timestamp": self.timestamp,
+        }
+
+
 # ─────────────────────────────────────────────────
 # Site Environment Simulation
 # ─────────────────────────────────────────────────
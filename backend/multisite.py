@@ -0,0 +1,270 @@
+"""
+Multi-Site Sharded Simulation
+==============================
+Runs many construction sites at once, one shard of sites per OS process so
+every core is used. Each site owns its SiteEnvironment, vectorized
+MachineFleet / WorkerFleet and EscalationManager, and ticks independently.
+
+Each shard diffs its own sites (DeltaPublisher, so the work runs in parallel)
+and sends only the changed leaf paths over a pipe to the parent, which is the
+single aggregating publisher: it merges every shard's delta for the round into
+one multi-path update under `sites/<site_id>` and writes it to the configured
+sink. Escalation triggers written to `sites/<site_id>/events/escalation_trigger`
+are forwarded to the owning shard.
+
+Deltas and control messages (escalation triggers, paths the uplink lost) use
+separate one-way pipes, and control messages are sent by a per-shard thread,
+so the aggregation loop never blocks on a shard that is itself blocked
+sending its delta.
+
+Usage:
+  python multisite.py --sites 24 --processes 8 --machines 500 --workers 5000
+  python multisite.py --sites 24 --fast-forward 3600
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import random
+import threading
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from clock import SYSTEM_CLOCK, SimulatedClock
+from config import (SIMULATION_FREQUENCY, NUM_WORKERS, NUM_MACHINES, MACHINE_TYPES, PUBLISH_DEADBANDS,
+                    PUBLISH_RESET_FIELDS, PUBLISH_QUEUE_SIZE, PUBLISH_OVERFLOW_POLICY)
+from models import MachineFleet, WorkerFleet, SiteEnvironment
+from publisher import DeltaPublisher, BackgroundPublisher
+from simulation import EscalationManager
+from sinks import create_sink
+
+LOST_PATHS_MAX = 4096  # beyond this, a shard resends its full state instead of a path list
+
+
+class SiteShard:
+    """One site: environment, vectorized fleets and escalation state."""
+
+    def __init__(self, site_id, n_machines, n_workers, seed=None, clock=None):
+        self.site_id = site_id
+        self.clock = clock or SYSTEM_CLOCK
+
+        machine_ids = [f"CONST-{str(i + 1).zfill(3)}" for i in range(n_machines)]
+        machine_types = [MACHINE_TYPES[i % len(MACHINE_TYPES)] for i in range(n_machines)]
+        self.machines = MachineFleet(machine_ids, machine_types, seed=seed, clock=self.clock)
+
+        # Deterministic round-robin assignment (matches WORKER_MACHINE_MAP for the default site)
+        worker_ids = [f"W{i + 1}" for i in range(n_workers)]
+        assigned = [machine_ids[i % n_machines] for i in range(n_workers)]
+        self.workers = WorkerFleet(worker_ids, assigned, self.machines.index,
+                                   seed=None if seed is None else seed + 1, clock=self.clock)
+
+        self.env = SiteEnvironment()
+        self.escalation = EscalationManager(None, clock=self.clock, num_workers=n_workers)
+        self._esc = np.zeros(n_workers)
+        self._machine_esc = np.zeros(n_machines)
+
+    def set_escalation(self, active):
+        if active:
+            self.escalation._activate()
+        else:
+            self.escalation._deactivate()
+
+    def tick(self):
+        """Advance the site by one tick and return its publishable snapshot."""
+        if self.escalation.needs_reset:
+            self.machines.reset()
+            self.workers.reset()
+            self.escalation.needs_reset = False
+
+        env_data = self.env.update()
+
+        # Per-worker escalation vector → per-machine max via the worker → machine index
+        self._esc.fill(0.0)
+        for wid, factor in self.escalation.get_factors().items():
+            self._esc[self.workers.index[wid]] = factor
+        self._machine_esc.fill(0.0)
+        np.maximum.at(self._machine_esc, self.workers.machine_slot, self._esc)
+
+        self.machines.update(self._machine_esc, ambient_temp=self.env.ambient_temp,
+                             cooling_efficiency=self.env.cooling_efficiency)
+        self.workers.update(self.machines.stress_index, self._esc,
+                            humidity_factor=self.env.fatigue_multiplier)
+
+        now = self.clock.time()
+        return {
+            "machines": self.machines.to_dicts(),
+            "workers": self.workers.to_dicts(),
+            "env": env_data,
+            "last_updated": now,
+            "events": {
+                "escalation_active": self.escalation.is_active,
+                "escalation_progress": int(now - self.escalation.start_time) if self.escalation.is_active else 0,
+            },
+        }
+
+
+class _Outbox:
+    """update() sink that collects a shard's per-tick delta for the pipe."""
+
+    def __init__(self):
+        self.pending = {}
+
+    def update(self, updates):
+        self.pending.update(updates)
+
+    def drain(self):
+        pending, self.pending = self.pending, {}
+        return pending
+
+
+def _run_shard(site_ids, conn, control, n_machines, n_workers, ticks, seed):
+    """Process entry point: tick every site in this shard and stream deltas to the parent."""
+    random.seed(seed)  # EscalationManager draws from the module-level RNG
+    clock = SimulatedClock() if ticks is not None else SYSTEM_CLOCK
+    shards = {
+        sid: SiteShard(sid, n_machines, n_workers, seed=seed + 2 * i, clock=clock)
+        for i, sid in enumerate(site_ids)
+    }
+    outbox = _Outbox()
+    publisher = DeltaPublisher(outbox, deadbands=PUBLISH_DEADBANDS, reset_fields=PUBLISH_RESET_FIELDS)
+    period = 1.0 / SIMULATION_FREQUENCY
+    tick = 0
+    while ticks is None or tick < ticks:
+        loop_start = clock.time()
+
+        # Control messages from the parent
+        while control.poll():
+            kind, payload = control.recv()
+            if kind == "escalation":
+                sid, active = payload
+                shards[sid].set_escalation(active)
+            elif kind == "lost":
+                publisher.forget(payload)
+            elif kind == "resync":
+                publisher.resync()
+
+        for sid, shard in shards.items():
+            publisher.stage(f'sites/{sid}', shard.tick())
+        publisher.flush()
+        conn.send((len(shards), outbox.drain()))
+        tick += 1
+
+        if ticks is not None:
+            clock.advance(period)
+        else:
+            clock.sleep(period - (clock.time() - loop_start))
+    conn.send(None)
+
+
+def _send_control(outbox, conn):
+    """Thread body: forward queued control messages to one shard until None or the shard exits."""
+    while True:
+        message = outbox.get()
+        if message is None:
+            break
+        try:
+            conn.send(message)
+        except (BrokenPipeError, OSError):
+            break
+    conn.close()
+
+
+def run(n_sites, processes, n_machines, n_workers, ticks=None, seed=0):
+    """Start the shard processes and aggregate their deltas into one publisher."""
+    sink = create_sink()
+    root = sink.reference() if sink else None
+    uplink = None
+    if root and ticks is None:
+        uplink = BackgroundPublisher(root, max_queue=PUBLISH_QUEUE_SIZE, policy=PUBLISH_OVERFLOW_POLICY)
+
+    site_ids = [f"SITE-{str(i + 1).zfill(3)}" for i in range(n_sites)]
+    processes = max(1, min(processes, n_sites))
+    conns, owner, outboxes = [], {}, {}
+    for p in range(processes):
+        shard_sites = site_ids[p::processes]
+        delta_recv, delta_send = mp.Pipe(duplex=False)
+        control_recv, control_send = mp.Pipe(duplex=False)
+        proc = mp.Process(target=_run_shard, name=f"shard-{p}", daemon=True,
+                          args=(shard_sites, delta_send, control_recv, n_machines, n_workers, ticks,
+                                seed + 1000 * p))
+        proc.start()
+        delta_send.close()
+        control_recv.close()
+        conns.append(delta_recv)
+        outboxes[delta_recv] = queue.Queue()
+        threading.Thread(target=_send_control, args=(outboxes[delta_recv], control_send),
+                         name=f"control-{p}", daemon=True).start()
+        for sid in shard_sites:
+            owner[sid] = delta_recv
+    print(f"[MULTISITE] {n_sites} sites × ({n_machines} machines, {n_workers} workers) on {processes} processes")
+
+    def _send(sid, message):
+        # Never blocks: the shard's control thread does the pipe write
+        outboxes[owner[sid]].put(message)
+
+    # Forward per-site escalation triggers to the owning shard
+    if root:
+        def _forwarder(sid):
+            def _on_trigger(event):
+                if isinstance(event.data, bool):
+                    _send(sid, ("escalation", (sid, event.data)))
+            return _on_trigger
+        for sid in site_ids:
+            root.child(f'sites/{sid}/events/escalation_trigger').listen(_forwarder(sid))
+
+    site_ticks = 0
+    paths_sent = 0
+    wall_start = time.time()
+    open_conns = list(conns)
+    while open_conns:
+        merged = {}
+        for conn in wait(open_conns):
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = None
+            if message is None:
+                open_conns.remove(conn)
+                continue
+            n, delta = message
+            site_ticks += n
+            merged.update(delta)
+
+        if merged and root:
+            try:
+                (uplink or root).update(merged)
+                paths_sent += len(merged)
+            except Exception as e:
+                print(f"\nError pushing to sink: {e}")
+
+        # Route paths the uplink dropped back to their shard so they get re-sent
+        if uplink:
+            by_shard = {}
+            for path in uplink.pop_lost_paths():
+                by_shard.setdefault(owner[path.split("/")[1]], []).append(path)
+            for conn, paths in by_shard.items():
+                outboxes[conn].put(("lost", paths) if len(paths) <= LOST_PATHS_MAX else ("resync", None))
+
+    for outbox in outboxes.values():
+        outbox.put(None)
+    wall = time.time() - wall_start
+    print(f"[MULTISITE] {site_ticks} site-ticks in {wall:.1f} s ({site_ticks / max(wall, 1e-9):.0f} site-ticks/s), "
+          f"{paths_sent} paths published")
+    if sink:
+        sink.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harmony Aura multi-site sharded simulation")
+    parser.add_argument("--sites", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--machines", type=int, default=NUM_MACHINES, help="machines per site")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="workers per site")
+    parser.add_argument("--fast-forward", type=int, metavar="TICKS", default=None,
+                        help="run TICKS ticks per site headless on a simulated clock")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sites, args.processes, args.machines, args.workers, ticks=args.fast_forward, seed=args.seed)
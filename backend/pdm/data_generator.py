@@ -14,14 +14,28 @@ Labels correspond to machine health states:
   3 = Critical      (Imminent failure, immediate action required)
 
 Output: CSV files per machine type + a combined dataset for model training.
+Streaming mode (generate_dataset_streaming / --stream) writes sequences in
+chunks straight into memory-mapped X.npy / y.npy, so peak memory stays flat
+whatever the dataset size; CSV output is optional there. --store additionally
+converts X.npy / y.npy into the columnar float16 store (see dataset_store.py).
 """
 
 import os
 import csv
 import random
 import math
+import argparse
+import multiprocessing as mp
+from collections import Counter
+from functools import lru_cache
+
 import numpy as np
 
+try:
+    from .dataset_store import write_store
+except ImportError:  # run as a script from backend/pdm
+    from dataset_store import write_store
+
 # ─────────────────────────────────────────────
 # Machine-Type Physical Profiles (matching backend)
 # ─────────────────────────────────────────────
@@ -69,6 +83,10 @@ DEGRADATION_MODES = [
     "electrical_fault",   # Sudden RPM spikes and dips
 ]
 
+FEATURE_NAMES = ["rpm", "load", "temp", "vibration", "oil_pressure", "ambient_temp"]
+LABEL_NAMES = {0: "Healthy", 1: "Caution", 2: "Serious", 3: "Critical"}
+GENERATOR_VERSION = "2"  # bump when the synthesis changes; recorded in the dataset store manifest
+
 
 def ou_noise(prev, mean_reversion=0.3, volatility=1.0):
     """Ornstein-Uhlenbeck mean-reverting noise step."""
@@ -241,6 +259,140 @@ def generate_degradation_sequence(profile, mode, seq_len=60, max_progress=1.0):
     return readings, labels
 
 
+# ─────────────────────────────────────────────
+# Vectorized Batch Synthesis (NumPy)
+# ─────────────────────────────────────────────
+# Same processes as the per-step generators above, for B sequences at once.
+# Smoothing and OU noise are first-order linear recurrences, so each becomes
+# one (B, T) @ (T, T) product with a lower-triangular decay matrix; mode
+# transitions are a forward-fill of the ticks on which a new mode was drawn.
+# Seeded by a numpy Generator, so batches are reproducible but not
+# sample-for-sample identical to the `random`-based generators.
+
+HEALTHY_MODE_CHOICES = np.array([0, 1, 1, 2])  # IDLE, WORKING, WORKING, PEAK
+DECIMALS = np.array([1, 1, 1, 2, 1, 1])        # per-feature rounding, as in the per-step generators
+
+# Per unit of deg_factor: (vibration boost, rpm instability range, temp boost, load boost, oil drop)
+DEGRADATION_EFFECTS = {
+    "bearing_wear":     (12.0, (-80, 80), 8.0, 5.0, 0.0),
+    "coolant_leak":     (2.0, (-20, 20), 40.0, 10.0, 5.0),
+    "overload_fatigue": (6.0, (-30, 50), 20.0, 30.0, 3.0),
+    "oil_degradation":  (4.0, (-40, 40), 15.0, 8.0, 20.0),
+    "electrical_fault": (3.0, (-50, 50), 10.0, 12.0, 2.0),
+}
+
+
+@lru_cache(maxsize=None)
+def _decay_matrix(decay, seq_len):
+    """L[t, k] = decay**(t - k) for k <= t, so y = x @ L.T solves y[t] = decay * y[t-1] + x[t]."""
+    t = np.arange(seq_len)
+    lag = t[:, None] - t[None, :]
+    return np.where(lag >= 0, decay ** np.maximum(lag, 0), 0.0)
+
+
+def _linear_recurrence(x, decay, initial=0.0):
+    """y[:, t] = decay * y[:, t-1] + x[:, t] with y[:, -1] = initial, over a (B, T) batch."""
+    seq_len = x.shape[1]
+    y = x @ _decay_matrix(decay, seq_len).T
+    if np.any(initial):
+        y += np.multiply.outer(initial, decay ** np.arange(1, seq_len + 1))
+    return y
+
+
+def _ou_batch(rng, shape, mean_reversion, volatility):
+    """OU noise paths starting at 0; volatility may be a scalar or a (B, T) array."""
+    return _linear_recurrence(rng.normal(0.0, 1.0, shape) * volatility, 1 - mean_reversion)
+
+
+def _smooth_batch(target, rate, initial):
+    """Exponential approach x += (target - x) * rate from `initial`, for every step."""
+    return _linear_recurrence(target * rate, 1 - rate, initial)
+
+
+def _round_features(readings):
+    for feature, decimals in enumerate(DECIMALS):
+        readings[..., feature] = np.round(readings[..., feature], decimals)
+    return readings
+
+
+def generate_healthy_batch(profile, batch_size, seq_len=60, rng=None):
+    """Vectorized generate_healthy_sequence: returns a (batch_size, seq_len, 6) float64 array."""
+    rng = rng if rng is not None else np.random.default_rng()
+    shape = (batch_size, seq_len)
+
+    # Mode chain: 10% chance per tick of re-drawing; carry the last draw forward
+    initial_mode = rng.choice(HEALTHY_MODE_CHOICES, batch_size)
+    redraw = rng.random(shape) < 0.10
+    draws = rng.choice(HEALTHY_MODE_CHOICES, shape)
+    last = np.maximum.accumulate(np.where(redraw, np.arange(seq_len), -1), axis=1)
+    mode = np.where(last >= 0, np.take_along_axis(draws, np.maximum(last, 0), axis=1), initial_mode[:, None])
+
+    p = profile
+    base_rpm = np.array([p["idle_rpm"], p["work_rpm"], p["peak_rpm"] * 0.85])
+    base_load = np.array([p["idle_load"], p["work_load"], p["peak_load"] * 0.85])
+    base_temp = np.array([p["idle_temp"], p["work_temp"], p["peak_temp"] * 0.80])
+    jitter_rpm, jitter_load, jitter_temp = np.array([20, 40, 50]), np.array([2, 5, 5]), np.array([1, 2, 3])
+    target_rpm = base_rpm[mode] + rng.uniform(-1, 1, shape) * jitter_rpm[mode]
+    target_load = base_load[mode] + rng.uniform(-1, 1, shape) * jitter_load[mode]
+    target_temp = base_temp[mode] + rng.uniform(-1, 1, shape) * jitter_temp[mode]
+
+    rpm = _smooth_batch(target_rpm, 0.08, p["idle_rpm"])
+    load = _smooth_batch(target_load, 0.06, p["idle_load"])
+    temp = _smooth_batch(target_temp, 0.03, p["idle_temp"])
+
+    out = np.empty(shape + (len(FEATURE_NAMES),))
+    out[..., 0] = np.maximum(400, rpm + _ou_batch(rng, shape, 0.3, 8.0))
+    out[..., 1] = np.clip(load + _ou_batch(rng, shape, 0.4, 0.8), 0, 100)
+    out[..., 2] = np.maximum(15, temp + _ou_batch(rng, shape, 0.2, 0.3))
+    out[..., 3] = p["vibration_base"] + (out[..., 1] / 100) * 4.0 + rng.uniform(-0.2, 0.2, shape)
+    out[..., 4] = np.maximum(0, (out[..., 0] / 2500) * 55 + rng.uniform(-0.5, 0.5, shape))
+    ambient_base = rng.uniform(25.0, 35.0, (batch_size, 1))
+    out[..., 5] = np.clip(ambient_base + _ou_batch(rng, shape, 0.15, 0.3), 18, 45)
+    return _round_features(out)
+
+
+def generate_degradation_batch(profile, mode, max_progress, seq_len=60, rng=None):
+    """Vectorized generate_degradation_sequence.
+
+    max_progress: (B,) array of how far into degradation each sequence goes.
+    Returns (readings (B, seq_len, 6) float64, per-step labels (B, seq_len) int).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    max_progress = np.asarray(max_progress, dtype=np.float64)
+    batch_size = len(max_progress)
+    shape = (batch_size, seq_len)
+
+    progress = np.arange(seq_len) / seq_len * max_progress[:, None]
+    labels = np.digitize(progress, [0.3, 0.55, 0.8])
+    deg = progress ** 1.5  # Accelerating degradation curve
+
+    vib_k, (rpm_lo, rpm_hi), temp_k, load_k, oil_k = DEGRADATION_EFFECTS[mode]
+    rpm_instability = deg * rng.uniform(rpm_lo, rpm_hi, shape)
+    if mode == "electrical_fault":
+        # Sudden spikes after 50% progress
+        spike = (progress > 0.5) & (rng.random(shape) < 0.3)
+        magnitude = rng.choice([-1, 1], shape) * rng.uniform(200, 500, shape)
+        rpm_instability = np.where(spike, magnitude, rpm_instability)
+
+    p = profile
+    out = np.empty(shape + (len(FEATURE_NAMES),))
+    out[..., 0] = np.maximum(400, p["work_rpm"] + rpm_instability + _ou_batch(rng, shape, 0.3, 10.0 + deg * 15.0))
+    out[..., 1] = np.clip(p["work_load"] + deg * load_k + _ou_batch(rng, shape, 0.4, 1.0 + deg * 3.0), 0, 100)
+    out[..., 2] = np.maximum(15, p["work_temp"] + deg * temp_k + _ou_batch(rng, shape, 0.2, 0.5 + deg * 2.0))
+    out[..., 3] = np.maximum(0, p["vibration_base"] + (out[..., 1] / 100) * 4.0 + deg * vib_k
+                             + rng.uniform(-0.2, 0.2, shape))
+    out[..., 4] = np.maximum(0, (out[..., 0] / 2500) * 55 - deg * oil_k + rng.uniform(-1.5, 1.5, shape))
+    ambient_base = rng.uniform(30.0, 40.0, (batch_size, 1))
+    out[..., 5] = np.clip(ambient_base + deg * 8.0 + _ou_batch(rng, shape, 0.15, 0.4), 18, 52)
+    return _round_features(out), labels
+
+
+def draw_max_progress_batch(target_label, batch_size, rng):
+    """Vectorized _draw_max_progress."""
+    low, high = {1: (0.35, 0.50), 2: (0.60, 0.75), 3: (0.85, 1.0)}[target_label]
+    return rng.uniform(low, high, batch_size)
+
+
 def generate_dataset(
     samples_per_class_per_type=500,
     seq_len=60,
@@ -250,7 +402,7 @@ def generate_dataset(
     os.makedirs(output_dir, exist_ok=True)
 
     all_sequences = []  # Each: (machine_type, sequence_data, label)
-    feature_names = ["rpm", "load", "temp", "vibration", "oil_pressure", "ambient_temp"]
+    feature_names = FEATURE_NAMES
 
     for machine_type, profile in MACHINE_PROFILES.items():
         print(f"\n{'='*50}")
@@ -272,17 +424,8 @@ def generate_dataset(
             for target_label in [1, 2, 3]:  # Caution, Serious, Critical
                 print(f"  → {per_mode_per_label} {DEGRADATION_MODES[0] if mode == DEGRADATION_MODES[0] else mode} → label {target_label}...")
                 for _ in range(per_mode_per_label):
-                    # Generate a partial sequence that ends at the target label
-                    # by controlling how far into degradation we go
-                    if target_label == 1:
-                        max_progress = random.uniform(0.35, 0.50)  # Stop in Caution zone
-                    elif target_label == 2:
-                        max_progress = random.uniform(0.60, 0.75)  # Stop in Serious zone
-                    else:
-                        max_progress = random.uniform(0.85, 1.0)   # Reach Critical
-
                     seq, labels = generate_degradation_sequence(
-                        profile, mode, seq_len, max_progress=max_progress
+                        profile, mode, seq_len, max_progress=_draw_max_progress(target_label)
                     )
                     type_sequences.append((seq, target_label))
                     all_sequences.append((machine_type, seq, target_label))
@@ -302,14 +445,299 @@ def generate_dataset(
     _save_numpy(output_dir, all_sequences, seq_len)
 
     # ── Print class distribution ──
-    from collections import Counter
-    label_counts = Counter([s[2] for s in all_sequences])
+    _print_distribution(Counter([s[2] for s in all_sequences]))
+
+    return all_sequences
+
+
+def _draw_max_progress(target_label):
+    """How far into degradation a sequence goes so that it ends at the target label."""
+    if target_label == 1:
+        return random.uniform(0.35, 0.50)  # Stop in Caution zone
+    elif target_label == 2:
+        return random.uniform(0.60, 0.75)  # Stop in Serious zone
+    return random.uniform(0.85, 1.0)       # Reach Critical
+
+
+def _print_distribution(label_counts):
     print(f"\nClass Distribution:")
-    label_names = {0: "Healthy", 1: "Caution", 2: "Serious", 3: "Critical"}
     for lbl in sorted(label_counts.keys()):
-        print(f"  {label_names[lbl]}: {label_counts[lbl]} samples")
+        print(f"  {LABEL_NAMES[lbl]}: {label_counts[lbl]} samples")
 
-    return all_sequences
+
+def _plan_runs(samples_per_class_per_type):
+    """(machine_type, degradation mode or None, label, count) runs, in generate_dataset order."""
+    per_mode_per_label = samples_per_class_per_type // len(DEGRADATION_MODES)
+    for machine_type in MACHINE_PROFILES:
+        yield machine_type, None, 0, samples_per_class_per_type
+        for mode in DEGRADATION_MODES:
+            for target_label in [1, 2, 3]:
+                yield machine_type, mode, target_label, per_mode_per_label
+
+
+def _sequence_plan(samples_per_class_per_type):
+    """(machine_type, degradation mode or None, label) for every sequence, in generate_dataset order."""
+    for machine_type, mode, label, count in _plan_runs(samples_per_class_per_type):
+        for _ in range(count):
+            yield machine_type, mode, label
+
+
+def _generate_batch(machine_type, mode, label, batch_size, seq_len, rng):
+    """One vectorized batch for a plan run: (batch_size, seq_len, 6) float64 readings."""
+    profile = MACHINE_PROFILES[machine_type]
+    if mode is None:
+        return generate_healthy_batch(profile, batch_size, seq_len, rng)
+    readings, _ = generate_degradation_batch(profile, mode, draw_max_progress_batch(label, batch_size, rng),
+                                             seq_len, rng)
+    return readings
+
+
+def _plan_size(samples_per_class_per_type):
+    per_mode_per_label = samples_per_class_per_type // len(DEGRADATION_MODES)
+    return len(MACHINE_PROFILES) * (samples_per_class_per_type + per_mode_per_label * len(DEGRADATION_MODES) * 3)
+
+
+# ─────────────────────────────────────────────
+# Streaming Generation (memory-mapped output)
+# ─────────────────────────────────────────────
+
+def generate_dataset_streaming(
+    samples_per_class_per_type=500,
+    seq_len=60,
+    output_dir="backend/pdm/datasets",
+    chunk_size=1024,
+    write_csv=False,
+    dtype=np.float32,
+    vectorized=False,
+    seed=None,
+):
+    """Generate the dataset chunk by chunk into preallocated memory-mapped X.npy / y.npy.
+
+    Only one chunk of sequences is held in memory at a time; CSV rows (if
+    write_csv) are streamed to the per-type and combined files as generated.
+    By default draws the same random sequence as generate_dataset, so for the
+    same `random` seed X.npy matches (up to `dtype`). With vectorized=True,
+    each chunk is one NumPy batch from a Generator seeded with `seed`.
+    Returns the label counts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_total = _plan_size(samples_per_class_per_type)
+    X = np.lib.format.open_memmap(os.path.join(output_dir, "X.npy"), mode="w+",
+                                  dtype=dtype, shape=(n_total, seq_len, len(FEATURE_NAMES)))
+    y = np.lib.format.open_memmap(os.path.join(output_dir, "y.npy"), mode="w+",
+                                  dtype=np.int32, shape=(n_total,))
+    print(f"Streaming {n_total} sequences → {output_dir} (chunks of {chunk_size})")
+
+    csv_writers = _StreamingCsv(output_dir, seq_len) if write_csv else None
+    chunk_X = np.empty((chunk_size, seq_len, len(FEATURE_NAMES)), dtype=dtype)
+    chunk_y = np.empty(chunk_size, dtype=np.int32)
+    label_counts = Counter()
+    start = filled = 0
+    try:
+        if vectorized:
+            rng = np.random.default_rng(seed)
+            for machine_type, mode, label, count in _plan_runs(samples_per_class_per_type):
+                for offset in range(0, count, chunk_size):
+                    k = min(chunk_size, count - offset)
+                    batch = _generate_batch(machine_type, mode, label, k, seq_len, rng)
+                    X[start:start + k] = batch
+                    y[start:start + k] = label
+                    start += k
+                    label_counts[label] += k
+                    if csv_writers:
+                        for seq in batch.tolist():
+                            csv_writers.write(machine_type, seq, label)
+            sequence_plan = ()
+        else:
+            sequence_plan = _sequence_plan(samples_per_class_per_type)
+
+        for machine_type, mode, label in sequence_plan:
+            profile = MACHINE_PROFILES[machine_type]
+            if mode is None:
+                seq = generate_healthy_sequence(profile, seq_len)
+            else:
+                seq, _ = generate_degradation_sequence(profile, mode, seq_len,
+                                                       max_progress=_draw_max_progress(label))
+            chunk_X[filled] = seq
+            chunk_y[filled] = label
+            filled += 1
+            label_counts[label] += 1
+            if csv_writers:
+                csv_writers.write(machine_type, seq, label)
+
+            if filled == chunk_size:
+                X[start:start + filled] = chunk_X
+                y[start:start + filled] = chunk_y
+                start += filled
+                filled = 0
+        X[start:start + filled] = chunk_X[:filled]
+        y[start:start + filled] = chunk_y[:filled]
+        X.flush()
+        y.flush()
+    finally:
+        if csv_writers:
+            csv_writers.close()
+        del X, y
+
+    print(f"\n  ✓ NumPy arrays saved: X.shape={(n_total, seq_len, len(FEATURE_NAMES))}, y.shape={(n_total,)}")
+    _print_distribution(label_counts)
+    return label_counts
+
+
+class _StreamingCsv:
+    """Row-at-a-time writers for the per-type CSVs and the combined CSV."""
+
+    def __init__(self, output_dir, seq_len):
+        self.output_dir = output_dir
+        self.header = [f"{feat}_t{t}" for t in range(seq_len) for feat in FEATURE_NAMES] + ["label"]
+        self._files = {}
+        self._writers = {}
+        self._combined = self._open("combined_dataset.csv", ["machine_type"] + self.header)
+
+    def _open(self, name, header):
+        f = open(os.path.join(self.output_dir, name), 'w', newline='')
+        writer = csv.writer(f)
+        writer.writerow(header)
+        self._files[name] = f
+        return writer
+
+    def write(self, machine_type, seq, label):
+        writer = self._writers.get(machine_type)
+        if writer is None:
+            writer = self._writers[machine_type] = self._open(f"{machine_type.lower()}_dataset.csv", self.header)
+        row = [value for timestep in seq for value in timestep] + [label]
+        writer.writerow(row)
+        self._combined.writerow([machine_type] + row)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+
+# ─────────────────────────────────────────────
+# Parallel Generation (deterministic shards)
+# ─────────────────────────────────────────────
+# Work is sharded by (machine type, healthy | degradation mode). Every run of
+# a shard is generated in fixed SHARD_BLOCK-sized batches, each from its own
+# SeedSequence(master_seed, spawn_key=(run index, block index)), so the merged
+# output depends only on the master seed — not on process count, scheduling
+# or chunk size.
+
+SHARD_BLOCK = 1024
+
+
+def _shard_plan(samples_per_class_per_type):
+    """[(shard name, [(run index, machine_type, mode, label, count), ...])] in generate_dataset order."""
+    shards = {}
+    for run_index, (machine_type, mode, label, count) in enumerate(_plan_runs(samples_per_class_per_type)):
+        name = f"{machine_type.lower()}_{mode or 'healthy'}"
+        shards.setdefault(name, []).append((run_index, machine_type, mode, label, count))
+    return list(shards.items())
+
+
+def _generate_shard(task):
+    """Pool worker: write one shard's X / y .npy files. Returns (name, n sequences)."""
+    name, runs, seq_len, master_seed, shard_dir, dtype = task
+    n = sum(run[-1] for run in runs)
+    X = np.lib.format.open_memmap(os.path.join(shard_dir, f"{name}.X.npy"), mode="w+",
+                                  dtype=dtype, shape=(n, seq_len, len(FEATURE_NAMES)))
+    y = np.lib.format.open_memmap(os.path.join(shard_dir, f"{name}.y.npy"), mode="w+",
+                                  dtype=np.int32, shape=(n,))
+    start = 0
+    for run_index, machine_type, mode, label, count in runs:
+        for block, offset in enumerate(range(0, count, SHARD_BLOCK)):
+            k = min(SHARD_BLOCK, count - offset)
+            rng = np.random.default_rng(np.random.SeedSequence(master_seed, spawn_key=(run_index, block)))
+            X[start:start + k] = _generate_batch(machine_type, mode, label, k, seq_len, rng)
+            y[start:start + k] = label
+            start += k
+    X.flush()
+    y.flush()
+    del X, y
+    return name, n
+
+
+def generate_dataset_parallel(
+    samples_per_class_per_type=500,
+    seq_len=60,
+    output_dir="backend/pdm/datasets",
+    seed=0,
+    processes=None,
+    chunk_size=SHARD_BLOCK * 16,
+    dtype=np.float32,
+    keep_shards=False,
+):
+    """Generate shards on a process pool, then merge them into X.npy / y.npy.
+
+    For a given master `seed` the merged files are byte-identical whatever
+    `processes` is. Shards are written to <output_dir>/shards and removed
+    after the merge unless keep_shards. Returns the label counts.
+    """
+    shard_dir = os.path.join(output_dir, "shards")
+    os.makedirs(shard_dir, exist_ok=True)
+    shards = _shard_plan(samples_per_class_per_type)
+    processes = max(1, min(processes or os.cpu_count() or 1, len(shards)))
+    tasks = [(name, runs, seq_len, seed, shard_dir, np.dtype(dtype).str) for name, runs in shards]
+    print(f"Generating {len(shards)} shards on {processes} processes (master seed {seed})")
+
+    with mp.Pool(processes) as pool:
+        for name, n in pool.imap_unordered(_generate_shard, tasks):
+            print(f"  ✓ {name}: {n} sequences")
+
+    # ── Merge in plan order, streaming chunk by chunk ──
+    n_total = _plan_size(samples_per_class_per_type)
+    X = np.lib.format.open_memmap(os.path.join(output_dir, "X.npy"), mode="w+",
+                                  dtype=dtype, shape=(n_total, seq_len, len(FEATURE_NAMES)))
+    y = np.lib.format.open_memmap(os.path.join(output_dir, "y.npy"), mode="w+",
+                                  dtype=np.int32, shape=(n_total,))
+    label_counts = Counter()
+    start = 0
+    for name, _ in shards:
+        shard_X = np.load(os.path.join(shard_dir, f"{name}.X.npy"), mmap_mode="r")
+        shard_y = np.load(os.path.join(shard_dir, f"{name}.y.npy"), mmap_mode="r")
+        for offset in range(0, len(shard_y), chunk_size):
+            k = min(chunk_size, len(shard_y) - offset)
+            X[start:start + k] = shard_X[offset:offset + k]
+            y[start:start + k] = shard_y[offset:offset + k]
+            start += k
+        label_counts.update({lbl: int(c) for lbl, c in enumerate(np.bincount(shard_y)) if c})
+        del shard_X, shard_y
+        if not keep_shards:
+            os.remove(os.path.join(shard_dir, f"{name}.X.npy"))
+            os.remove(os.path.join(shard_dir, f"{name}.y.npy"))
+    X.flush()
+    y.flush()
+    del X, y
+    if not keep_shards:
+        os.rmdir(shard_dir)
+
+    print(f"\n  ✓ NumPy arrays saved: X.shape={(n_total, seq_len, len(FEATURE_NAMES))}, y.shape={(n_total,)}")
+    _print_distribution(label_counts)
+    return label_counts
+
+
+# ─────────────────────────────────────────────
+# Columnar Store
+# ─────────────────────────────────────────────
+
+def _type_counts(samples_per_class_per_type):
+    """{machine_type: sequence count}, in plan (row) order."""
+    counts = Counter()
+    for machine_type, _, _, count in _plan_runs(samples_per_class_per_type):
+        counts[machine_type] += count
+    return dict(counts)
+
+
+def write_dataset_store(samples_per_class_per_type=500, output_dir="backend/pdm/datasets",
+                        seed=None, dtype="float16"):
+    """Convert the generated X.npy / y.npy into <output_dir>/store, chunk by chunk."""
+    X = np.load(os.path.join(output_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(output_dir, "y.npy"), mmap_mode="r")
+    store_dir = os.path.join(output_dir, "store")
+    write_store(store_dir, X, y, _type_counts(samples_per_class_per_type), dtype=dtype,
+                feature_names=FEATURE_NAMES, seed=seed, generator_version=GENERATOR_VERSION)
+    print(f"  ✓ Columnar store saved → {store_dir} ({dtype})")
+    return store_dir
 
 
 def _save_csv(filepath, sequences, feature_names, seq_len):
@@ -367,13 +795,53 @@ def _save_numpy(output_dir, all_sequences, seq_len):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HarmonyAura PdM synthetic data generator")
+    parser.add_argument("--samples", type=int, default=500, help="samples per class per machine type")
+    parser.add_argument("--seq-len", type=int, default=60)
+    parser.add_argument("--stream", action="store_true",
+                        help="chunked generation into memory-mapped X.npy / y.npy (flat memory)")
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--csv", action="store_true", help="also write CSVs in streaming mode")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="streaming mode: synthesize each chunk as one NumPy batch")
+    parser.add_argument("--parallel", action="store_true",
+                        help="shard by machine type and mode across processes (deterministic for --seed)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--store", action="store_true",
+                        help="also write the columnar float16 dataset store (datasets/store)")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("  HarmonyAura -- Predictive Maintenance Data Generator")
     print("=" * 60)
+    if args.seed is not None:
+        random.seed(args.seed)
     _script_dir = os.path.dirname(os.path.abspath(__file__))
-    generate_dataset(
-        samples_per_class_per_type=500,
-        seq_len=60,
-        output_dir=os.path.join(_script_dir, "datasets")
-    )
+    if args.parallel:
+        generate_dataset_parallel(
+            samples_per_class_per_type=args.samples,
+            seq_len=args.seq_len,
+            output_dir=os.path.join(_script_dir, "datasets"),
+            seed=args.seed or 0,
+            processes=args.processes,
+        )
+    elif args.stream:
+        generate_dataset_streaming(
+            samples_per_class_per_type=args.samples,
+            seq_len=args.seq_len,
+            output_dir=os.path.join(_script_dir, "datasets"),
+            chunk_size=args.chunk_size,
+            write_csv=args.csv,
+            vectorized=args.vectorized,
+            seed=args.seed,
+        )
+    else:
+        generate_dataset(
+            samples_per_class_per_type=args.samples,
+            seq_len=args.seq_len,
+            output_dir=os.path.join(_script_dir, "datasets")
+        )
+    if args.store:
+        write_dataset_store(args.samples, os.path.join(_script_dir, "datasets"), seed=args.seed)
     print("\nData generation complete!")
@@ -0,0 +1,296 @@
+"""
+Predictive Maintenance — Columnar Dataset Store
+=================================================
+Compact binary replacement for the wide per-type CSVs and X.npy.
+
+Layout (one directory):
+  manifest.json                  feature names, machine types, label counts,
+                                 dtype, seed, generator version
+  <machine_type>/<feature>.npy   (n, seq_len) float16 / float32 column
+  <machine_type>/label.npy       (n,) int8
+
+Columns are written chunk by chunk into preallocated .npy files and read back
+memory-mapped, so loading is lazy: selecting one machine type touches only that
+type's files, and nothing is decoded from text.
+
+Usage:
+  python backend/pdm/dataset_store.py --from-csv backend/pdm/datasets
+  python backend/pdm/dataset_store.py --from-npy backend/pdm/datasets --machine-types Excavator ... [--counts N ...]
+"""
+
+import os
+import csv
+import json
+import argparse
+import itertools
+
+import numpy as np
+
+STORE_VERSION = 1
+MANIFEST = "manifest.json"
+FEATURE_NAMES = ["rpm", "load", "temp", "vibration", "oil_pressure", "ambient_temp"]
+LABEL_NAMES = {0: "Healthy", 1: "Caution", 2: "Serious", 3: "Critical"}
+CHUNK_ROWS = 8192
+
+
+# ─────────────────────────────────────────────
+# Writing
+# ─────────────────────────────────────────────
+
+class DatasetWriter:
+    """Preallocates every column for known per-type row counts, then takes
+    (machine_type, X chunk, y chunk) appends in any chunk size."""
+
+    def __init__(self, store_dir, type_counts, seq_len=60, dtype="float16",
+                 feature_names=FEATURE_NAMES, seed=None, generator_version=None):
+        """type_counts: {machine_type: number of sequences}, in row order."""
+        self.store_dir = store_dir
+        self.seq_len = seq_len
+        self.dtype = np.dtype(dtype)
+        self.feature_names = list(feature_names)
+        self._meta = {"seed": seed, "generator_version": generator_version}
+        self._counts = dict(type_counts)
+        self._filled = dict.fromkeys(self._counts, 0)
+        self._label_counts = {t: np.zeros(len(LABEL_NAMES), dtype=np.int64) for t in self._counts}
+        self._columns = {}
+        self._labels = {}
+        for machine_type, n in self._counts.items():
+            type_dir = os.path.join(store_dir, machine_type)
+            os.makedirs(type_dir, exist_ok=True)
+            self._columns[machine_type] = [
+                np.lib.format.open_memmap(os.path.join(type_dir, f"{feature}.npy"), mode="w+",
+                                          dtype=self.dtype, shape=(n, seq_len))
+                for feature in self.feature_names
+            ]
+            self._labels[machine_type] = np.lib.format.open_memmap(
+                os.path.join(type_dir, "label.npy"), mode="w+", dtype=np.int8, shape=(n,))
+
+    def append(self, machine_type, X, y):
+        """X: (k, seq_len, n_features) readings; y: (k,) labels."""
+        start = self._filled[machine_type]
+        k = len(y)
+        if start + k > self._counts[machine_type]:
+            raise ValueError(f"{machine_type}: more rows than the {self._counts[machine_type]} declared")
+        for f, column in enumerate(self._columns[machine_type]):
+            column[start:start + k] = X[:, :, f]
+        self._labels[machine_type][start:start + k] = y
+        self._label_counts[machine_type] += np.bincount(y, minlength=len(LABEL_NAMES))[:len(LABEL_NAMES)]
+        self._filled[machine_type] = start + k
+
+    def close(self):
+        """Flush the columns and write the manifest (last, so a partial store has none)."""
+        for machine_type, columns in self._columns.items():
+            if self._filled[machine_type] != self._counts[machine_type]:
+                raise ValueError(f"{machine_type}: {self._filled[machine_type]} of "
+                                 f"{self._counts[machine_type]} rows written")
+            for column in columns:
+                column.flush()
+            self._labels[machine_type].flush()
+        self._columns.clear()
+        self._labels.clear()
+
+        manifest = {
+            "store_version": STORE_VERSION,
+            "generator_version": self._meta["generator_version"],
+            "seed": self._meta["seed"],
+            "dtype": self.dtype.name,
+            "seq_len": self.seq_len,
+            "features": self.feature_names,
+            "label_names": {str(k): v for k, v in LABEL_NAMES.items()},
+            "machine_types": {
+                machine_type: {
+                    "count": n,
+                    "labels": {str(lbl): int(c) for lbl, c in enumerate(self._label_counts[machine_type]) if c},
+                }
+                for machine_type, n in self._counts.items()
+            },
+        }
+        tmp_path = os.path.join(self.store_dir, MANIFEST + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.store_dir, MANIFEST))
+        return manifest
+
+
+def write_store(store_dir, X, y, type_counts, chunk_rows=CHUNK_ROWS, **kwargs):
+    """Write a whole (possibly memory-mapped) X / y whose rows are grouped by
+    machine type in type_counts order. Copies chunk_rows rows at a time."""
+    writer = DatasetWriter(store_dir, type_counts, seq_len=X.shape[1], **kwargs)
+    start = 0
+    for machine_type, n in type_counts.items():
+        for offset in range(0, n, chunk_rows):
+            k = min(chunk_rows, n - offset)
+            writer.append(machine_type, X[start + offset:start + offset + k],
+                          np.asarray(y[start + offset:start + offset + k]))
+        start += n
+    return writer.close()
+
+
+def csv_to_store(csv_dir, store_dir, chunk_rows=CHUNK_ROWS, **kwargs):
+    """Convert the per-type <type>_dataset.csv files (as written by data_generator) to a store."""
+    files = sorted(f for f in os.listdir(csv_dir) if f.endswith("_dataset.csv") and not f.startswith("combined"))
+    type_counts, seq_len = {}, None
+    for name in files:
+        with open(os.path.join(csv_dir, name), newline="") as f:
+            header = next(csv.reader(f))
+            type_counts[name[:-len("_dataset.csv")].capitalize()] = sum(1 for _ in f)
+        seq_len = (len(header) - 1) // len(FEATURE_NAMES)
+
+    writer = DatasetWriter(store_dir, type_counts, seq_len=seq_len, **kwargs)
+    for name, machine_type in zip(files, type_counts):
+        with open(os.path.join(csv_dir, name), newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            while True:
+                rows = list(itertools.islice(reader, chunk_rows))
+                if not rows:
+                    break
+                block = np.array(rows, dtype=np.float64)
+                writer.append(machine_type, block[:, :-1].reshape(len(rows), seq_len, len(FEATURE_NAMES)),
+                              block[:, -1].astype(np.int8))
+    return writer.close()
+
+
+# ─────────────────────────────────────────────
+# Reading
+# ─────────────────────────────────────────────
+
+class DatasetStore:
+    """Memory-mapped, lazily selected view of a dataset store."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["store_version"] > STORE_VERSION:
+            raise ValueError(f"Dataset store version {self.manifest['store_version']} is newer than "
+                             f"supported ({STORE_VERSION})")
+        self.features = self.manifest["features"]
+        self.seq_len = self.manifest["seq_len"]
+        self._mapped = {}
+
+    @staticmethod
+    def exists(store_dir):
+        return os.path.exists(os.path.join(store_dir, MANIFEST))
+
+    @property
+    def n_features(self):
+        return len(self.features)
+
+    @property
+    def machine_types(self):
+        return list(self.manifest["machine_types"])
+
+    def __len__(self):
+        return sum(t["count"] for t in self.manifest["machine_types"].values())
+
+    def _map(self, machine_type, name):
+        key = (machine_type, name)
+        if key not in self._mapped:
+            self._mapped[key] = np.load(os.path.join(self.store_dir, machine_type, f"{name}.npy"), mmap_mode="r")
+        return self._mapped[key]
+
+    def column(self, machine_type, feature):
+        """(n, seq_len) memory-mapped column of one feature for one machine type."""
+        return self._map(machine_type, feature)
+
+    def labels(self, machine_type):
+        return self._map(machine_type, "label")
+
+    def _select(self, machine_types):
+        if machine_types is None:
+            return self.machine_types
+        unknown = set(machine_types) - set(self.machine_types)
+        if unknown:
+            raise KeyError(f"Machine types not in store: {sorted(unknown)}")
+        return list(machine_types)
+
+    def load(self, machine_types=None, dtype=np.float32):
+        """Materialize (X (n, seq_len, n_features), y (n,)) for the selected machine types."""
+        selected = self._select(machine_types)
+        n = sum(self.manifest["machine_types"][t]["count"] for t in selected)
+        X = np.empty((n, self.seq_len, len(self.features)), dtype=dtype)
+        y = np.empty(n, dtype=np.int32)
+        start = 0
+        for machine_type in selected:
+            count = self.manifest["machine_types"][machine_type]["count"]
+            for f, feature in enumerate(self.features):
+                X[start:start + count, :, f] = self.column(machine_type, feature)
+            y[start:start + count] = self.labels(machine_type)
+            start += count
+        return X, y
+
+    def all_labels(self, machine_types=None):
+        """(n,) int32 labels for the selected machine types, in load() row order."""
+        selected = self._select(machine_types)
+        return np.concatenate([self.labels(t) for t in selected]).astype(np.int32)
+
+    def take(self, indices, machine_types=None, dtype=np.float32):
+        """Gather rows by index into the load() ordering without materializing the rest.
+
+        Returns (X (k, seq_len, n_features), y (k,)); sorted indices read the
+        memory-mapped columns most sequentially.
+        """
+        selected = self._select(machine_types)
+        counts = [self.manifest["machine_types"][t]["count"] for t in selected]
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        indices = np.asarray(indices, dtype=np.int64)
+        owner = np.searchsorted(bounds, indices, side="right") - 1
+        X = np.empty((len(indices), self.seq_len, len(self.features)), dtype=dtype)
+        y = np.empty(len(indices), dtype=np.int32)
+        for t in np.unique(owner):
+            rows = owner == t
+            local = indices[rows] - bounds[t]
+            for f, feature in enumerate(self.features):
+                X[rows, :, f] = self.column(selected[t], feature)[local]
+            y[rows] = self.labels(selected[t])[local]
+        return X, y
+
+    def iter_batches(self, machine_types=None, batch_size=CHUNK_ROWS, dtype=np.float32):
+        """Yield (X, y) blocks of at most batch_size rows without materializing the dataset."""
+        for machine_type in self._select(machine_types):
+            count = self.manifest["machine_types"][machine_type]["count"]
+            for offset in range(0, count, batch_size):
+                k = min(batch_size, count - offset)
+                X = np.empty((k, self.seq_len, len(self.features)), dtype=dtype)
+                for f, feature in enumerate(self.features):
+                    X[:, :, f] = self.column(machine_type, feature)[offset:offset + k]
+                yield X, self.labels(machine_type)[offset:offset + k].astype(np.int32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a columnar PdM dataset store")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-csv", metavar="DIR", help="directory of <type>_dataset.csv files")
+    source.add_argument("--from-npy", metavar="DIR", help="directory with X.npy / y.npy")
+    parser.add_argument("--machine-types", nargs="+", default=None,
+                        help="--from-npy: machine types in row order (X.npy must be grouped by type, "
+                             "as data_generator writes it)")
+    parser.add_argument("--counts", nargs="+", type=int, default=None,
+                        help="--from-npy: rows per machine type, in --machine-types order "
+                             "(default: equal-sized blocks)")
+    parser.add_argument("--out", default=None, help="store directory (default: <DIR>/store)")
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    args = parser.parse_args()
+
+    if args.from_csv:
+        out = args.out or os.path.join(args.from_csv, "store")
+        manifest = csv_to_store(args.from_csv, out, dtype=args.dtype)
+    else:
+        out = args.out or os.path.join(args.from_npy, "store")
+        X = np.load(os.path.join(args.from_npy, "X.npy"), mmap_mode="r")
+        y = np.load(os.path.join(args.from_npy, "y.npy"), mmap_mode="r")
+        types = args.machine_types or ["Excavator", "Bulldozer", "Crane", "Loader", "Truck"]
+        if args.counts:
+            if len(args.counts) != len(types) or sum(args.counts) != len(y):
+                parser.error(f"--counts must give one count per machine type ({len(types)}) "
+                             f"summing to the {len(y)} rows in y.npy")
+            counts = args.counts
+        elif len(y) % len(types):
+            parser.error(f"{len(y)} rows do not split evenly over {len(types)} machine types; "
+                         f"pass the per-type row counts with --counts")
+        else:
+            counts = [len(y) // len(types)] * len(types)
+        manifest = write_store(out, X, y, dict(zip(types, counts)), dtype=args.dtype)
+    print(f"✓ Store written → {out} ({sum(t['count'] for t in manifest['machine_types'].values())} sequences, "
+          f"{manifest['dtype']})")
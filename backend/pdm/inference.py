@@ -5,85 +5,348 @@ Loads the trained 1D CNN model and provides real-time health predictions
 for each machine using a sliding window of recent telemetry data.
 
 This module is imported by simulation.py to push predictions to Firebase.
+
+Forward-pass backends:
+  numpy  — folded-BatchNorm weights in pdm_model.npz (see numpy_model.py); no TensorFlow
+  keras  — pdm_model.keras through tf.keras (TensorFlow imported on first load)
+  tflite — post-training quantized pdm_model_int8.tflite (or _float16) from
+           `model.py --quantize`, on the TFLite interpreter (ai-edge-litert,
+           tflite-runtime or TensorFlow, whichever is installed)
+PDM_BACKEND=auto (default) uses numpy when pdm_model.npz exists, else keras;
+tflite is opt-in since quantization trades a little accuracy.
+With the numpy backend, PDM_INCREMENTAL=1 (default) evaluates each machine's
+window incrementally (IncrementalCNN): conv activations are cached per machine
+and only the steps new since the last call, plus the window edges, are computed.
+
+Change-detection gating: the engine keeps running per-machine window sums and
+sums of squares. A machine whose window mean / std (in scaler units) moved
+less than PDM_GATE_THRESHOLD since its last forward pass, and whose
+prediction is younger than PDM_GATE_MAX_AGE readings, gets its cached
+prediction back (with prediction_age) instead of a new forward pass.
 """
 
 import os
+import threading
 import numpy as np
 
 # Suppress TF verbose logging
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
-import tensorflow as tf
+try:
+    from .numpy_model import NumpyCNN, IncrementalCNN
+except ImportError:  # run as a script from backend/pdm
+    from numpy_model import NumpyCNN, IncrementalCNN
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "saved_model")
+PDM_BACKEND = os.environ.get("PDM_BACKEND", "auto")  # auto | numpy | keras | tflite
+PDM_INCREMENTAL = os.environ.get("PDM_INCREMENTAL", "1") == "1"
+PDM_GATE_THRESHOLD = float(os.environ.get("PDM_GATE_THRESHOLD", "0.05"))  # scaler std units; 0 disables
+PDM_GATE_MAX_AGE = int(os.environ.get("PDM_GATE_MAX_AGE", "60"))          # readings; 0 disables
 LABEL_NAMES = {0: "Healthy", 1: "Caution", 2: "Serious", 3: "Critical"}
 WINDOW_SIZE = 60  # Must match training seq_len
+N_FEATURES = 6    # rpm, load, temp, vibration, oil_pressure, ambient_temp
+
+
+TFLITE_PATHS = [os.path.join(MODEL_DIR, f"pdm_model_{mode}.tflite") for mode in ("int8", "float16")]
+
+
+def _tflite_interpreter():
+    """The lightest installed TFLite Interpreter class."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteModel:
+    """Quantized .tflite model behind the keras-style predict() the engine calls.
+    int8 input / output tensors are (de)quantized here with the tensors' own scales.
+
+    The input tensor is allocated for `capacity` rows and only ever grows
+    (doubling): smaller batches are padded into it and their outputs sliced,
+    so gated ticks with varying batch sizes never reallocate the interpreter."""
+
+    def __init__(self, path, capacity=64, num_threads=None):
+        self.path = path
+        self.interpreter = _tflite_interpreter()(model_path=path, num_threads=num_threads)
+        self.capacity = 0
+        self._reserve(capacity)
+
+    def _reserve(self, capacity):
+        inp = self.interpreter.get_input_details()[0]
+        self.interpreter.resize_tensor_input(inp["index"], [capacity] + list(inp["shape"][1:]))
+        self.interpreter.allocate_tensors()
+        self.capacity = capacity
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._buffer = np.zeros(self._input["shape"], dtype=self._input["dtype"])  # rows past the batch are padding
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        n = len(X)
+        if n > self.capacity:
+            self._reserve(max(n, 2 * self.capacity))
+        inp = self._input
+        if inp["dtype"] == np.int8:
+            scale, zero_point = inp["quantization"]
+            self._buffer[:n] = np.clip(np.round(X / scale) + zero_point, -128, 127)
+        else:
+            self._buffer[:n] = X
+        self.interpreter.set_tensor(inp["index"], self._buffer)
+        self.interpreter.invoke()
+        out = self._output
+        probs = self.interpreter.get_tensor(out["index"])[:n]
+        if out["dtype"] == np.int8:
+            scale, zero_point = out["quantization"]
+            probs = (probs.astype(np.float32) - zero_point) * scale
+        return probs
 
 
 class PredictiveMaintenanceEngine:
     """Real-time inference engine for machine health prediction."""
 
-    def __init__(self):
+    def __init__(self, n_machines=64, backend=PDM_BACKEND, incremental=PDM_INCREMENTAL,
+                 gate_threshold=PDM_GATE_THRESHOLD, gate_max_age=PDM_GATE_MAX_AGE):
+        if backend not in ("auto", "numpy", "keras", "tflite"):
+            raise ValueError(f"Unknown PdM backend: {backend}")
+        self.backend = backend
         self.model = None
+        self._want_incremental = incremental
+        self._incremental = None  # IncrementalCNN once a numpy model is loaded
         self.scaler_mean = None
         self.scaler_scale = None
-        self.buffers = {}  # machine_id → list of recent readings
         self._loaded = False
 
-    def load(self):
-        """Load the trained model and scaler parameters."""
+        # Fleet-wide ring buffer: one (WINDOW_SIZE, N_FEATURES) window per slot.
+        # Grows by doubling when more machines register than preallocated.
+        self.slots = {}  # machine_id → slot index
+        self._windows = np.zeros((n_machines, WINDOW_SIZE, N_FEATURES), dtype=np.float32)
+        self._cursor = np.zeros(n_machines, dtype=np.int64)  # next write position per slot
+        self._fill = np.zeros(n_machines, dtype=np.int64)    # readings held per slot (≤ WINDOW_SIZE)
+        self._count = np.zeros(n_machines, dtype=np.int64)   # readings ever pushed per slot
+        self._offsets = np.arange(WINDOW_SIZE)
+
+        # Change-detection gate: running window sums, and the window stats / result of the last forward pass
+        self.gate_threshold = gate_threshold
+        self.gate_max_age = gate_max_age
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._sum = np.zeros((n_machines, N_FEATURES))
+        self._sumsq = np.zeros((n_machines, N_FEATURES))
+        self._ref_mean = np.zeros((n_machines, N_FEATURES))
+        self._ref_std = np.zeros((n_machines, N_FEATURES))
+        self._pred_count = np.full(n_machines, -1, dtype=np.int64)  # _count at the last forward pass
+        self._cached = {}  # slot → prediction dict from the last forward pass
+
+    def load(self, warm_up=False):
+        """Load the trained model and scaler parameters.
+        With warm_up, run one throwaway fleet-sized forward pass before reporting
+        ready, so the first real inference tick doesn't pay graph tracing."""
         model_path = os.path.join(MODEL_DIR, "pdm_model.keras")
+        npz_path = os.path.join(MODEL_DIR, "pdm_model.npz")
         mean_path = os.path.join(MODEL_DIR, "scaler_mean.npy")
         scale_path = os.path.join(MODEL_DIR, "scaler_scale.npy")
 
-        if not os.path.exists(model_path):
-            print("[PdM] ⚠️  No trained model found. Run model.py first.")
+        backend = self.backend
+        if backend == "auto":
+            backend = "numpy" if os.path.exists(npz_path) else "keras"
+        if backend == "tflite":
+            path = next((p for p in TFLITE_PATHS if os.path.exists(p)), None)
+            if path is None:
+                print("[PdM] ⚠️  No quantized model found. Run model.py --quantize int8 first.")
+                return False
+        elif not os.path.exists(npz_path if backend == "numpy" else model_path):
+            print("[PdM] ⚠️  No trained model found. Run model.py first"
+                  + (" and numpy_model.py export." if backend == "numpy" else "."))
             return False
 
         try:
-            self.model = tf.keras.models.load_model(model_path)
-            self.scaler_mean = np.load(mean_path)
-            self.scaler_scale = np.load(scale_path)
-            self._loaded = True
-            print("[PdM] ✅ Model loaded successfully.")
+            if backend == "numpy":
+                self.model = NumpyCNN(npz_path)
+                if self._want_incremental:
+                    try:
+                        self._incremental = IncrementalCNN(self.model, WINDOW_SIZE, capacity=len(self._windows))
+                    except ValueError as e:
+                        print(f"[PdM] ⚠️  Incremental inference unavailable ({e}); using full passes.")
+            elif backend == "tflite":
+                self.model = TFLiteModel(path, capacity=len(self._windows))
+            else:
+                import tensorflow as tf
+                self.model = tf.keras.models.load_model(model_path)
+            self.backend = backend
+            self.scaler_mean = np.load(mean_path).astype(np.float32)
+            self.scaler_scale = np.load(scale_path).astype(np.float32)
+            if warm_up:
+                self.warm_up()
+            self._loaded = True  # last: predict_many stays a no-op until everything above is set
+            print(f"[PdM] ✅ Model loaded successfully ({backend} backend).")
             return True
         except Exception as e:
             print(f"[PdM] ❌ Failed to load model: {e}")
             return False
 
+    def warm_up(self):
+        """Trace / allocate for the fleet batch size with a dummy forward pass."""
+        n = max(1, len(self._windows))
+        self.model.predict(np.zeros((n, WINDOW_SIZE, N_FEATURES), dtype=np.float32), batch_size=n, verbose=0)
+
+    def load_async(self, on_done=None):
+        """load(warm_up=True) on a daemon thread. Readings can be pushed meanwhile;
+        predictions start once is_loaded. on_done(ok) is called from the thread."""
+        def _run():
+            ok = self.load(warm_up=True)
+            if on_done:
+                on_done(ok)
+        thread = threading.Thread(target=_run, name="pdm-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def _slot(self, machine_id):
+        """Return the ring-buffer slot for a machine, registering it if new."""
+        slot = self.slots.get(machine_id)
+        if slot is None:
+            slot = len(self.slots)
+            if slot >= len(self._windows):
+                self._grow(max(1, 2 * len(self._windows)))
+            self.slots[machine_id] = slot
+        return slot
+
+    def _grow(self, capacity):
+        extra = capacity - len(self._windows)
+        self._windows = np.concatenate(
+            [self._windows, np.zeros((extra, WINDOW_SIZE, N_FEATURES), dtype=np.float32)])
+        self._cursor = np.concatenate([self._cursor, np.zeros(extra, dtype=np.int64)])
+        self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+        self._fill = np.concatenate([self._fill, np.zeros(extra, dtype=np.int64)])
+        self._sum = np.concatenate([self._sum, np.zeros((extra, N_FEATURES))])
+        self._sumsq = np.concatenate([self._sumsq, np.zeros((extra, N_FEATURES))])
+        self._ref_mean = np.concatenate([self._ref_mean, np.zeros((extra, N_FEATURES))])
+        self._ref_std = np.concatenate([self._ref_std, np.zeros((extra, N_FEATURES))])
+        self._pred_count = np.concatenate([self._pred_count, np.full(extra, -1, dtype=np.int64)])
+
     def push_reading(self, machine_id, rpm, load, temp, vibration, oil_pressure, ambient_temp=30.0):
-        """Add a new sensor reading to the machine's buffer."""
-        if machine_id not in self.buffers:
-            self.buffers[machine_id] = []
+        """Add a new sensor reading to the machine's ring buffer (overwrites the oldest)."""
+        slot = self._slot(machine_id)
+        pos = self._cursor[slot]
+        reading = np.array((rpm, load, temp, vibration, oil_pressure, ambient_temp), dtype=np.float32)
+        if self._fill[slot] == WINDOW_SIZE:  # the reading being overwritten leaves the running sums
+            old = self._windows[slot, pos].astype(np.float64)
+            self._sum[slot] -= old
+            self._sumsq[slot] -= old * old
+        self._windows[slot, pos] = reading
+        reading = reading.astype(np.float64)
+        self._sum[slot] += reading
+        self._sumsq[slot] += reading * reading
+        self._cursor[slot] = (pos + 1) % WINDOW_SIZE
+        self._count[slot] += 1
+        if self._fill[slot] < WINDOW_SIZE:
+            self._fill[slot] += 1
 
-        self.buffers[machine_id].append([rpm, load, temp, vibration, oil_pressure, ambient_temp])
+    def _gather_windows(self, slots):
+        """Copy the windows for `slots` out of the ring in chronological order.
+        Returns a fresh (N, WINDOW_SIZE, N_FEATURES) array that callers may modify.
+        """
+        # Oldest reading sits at the write cursor; one fancy-index gather unrolls every ring
+        idx = (self._cursor[slots, None] + self._offsets) % WINDOW_SIZE
+        return self._windows[slots[:, None], idx]
 
-        # Keep only the last WINDOW_SIZE readings
-        if len(self.buffers[machine_id]) > WINDOW_SIZE:
-            self.buffers[machine_id] = self.buffers[machine_id][-WINDOW_SIZE:]
+    def window(self, machine_id):
+        """Return the raw (un-normalized) window for a machine, oldest first, or None."""
+        slot = self.slots.get(machine_id)
+        if slot is None:
+            return None
+        fill = int(self._fill[slot])
+        return self._gather_windows(np.array([slot]))[0, WINDOW_SIZE - fill:]
 
     def predict(self, machine_id):
         """Run inference on the current buffer for a machine.
         Returns: (health_label, confidence, probabilities) or None if buffer not full.
         """
-        if not self._loaded or machine_id not in self.buffers:
-            return None
+        return self.predict_many([machine_id]).get(machine_id)
+
+    def _gate(self, slots):
+        """Boolean mask over slots whose cached prediction can be reused."""
+        if self.gate_threshold <= 0 or self.gate_max_age <= 0:
+            return np.zeros(len(slots), dtype=bool)
+        mean = self._sum[slots] / WINDOW_SIZE
+        std = np.sqrt(np.maximum(self._sumsq[slots] / WINDOW_SIZE - mean * mean, 0.0))
+        drift = np.maximum(np.abs(mean - self._ref_mean[slots]), np.abs(std - self._ref_std[slots]))
+        drift = (drift / self.scaler_scale).max(axis=1)
+        age = self._count[slots] - self._pred_count[slots]
+        return (self._pred_count[slots] >= 0) & (age < self.gate_max_age) & (drift < self.gate_threshold)
+
+    def gate_stats(self):
+        """Forward passes skipped (hits) vs run (misses) by the change-detection gate."""
+        total = self.cache_hits + self.cache_misses
+        return {"hits": self.cache_hits, "misses": self.cache_misses,
+                "hit_rate": round(self.cache_hits / total, 3) if total else 0.0}
 
-        buffer = self.buffers[machine_id]
-        if len(buffer) < WINDOW_SIZE:
-            return None  # Not enough data yet
+    def predict_many(self, machine_ids):
+        """Run a single batched forward pass for several machines.
+        Machines whose buffer is not yet full are skipped; machines whose window
+        barely changed since their last forward pass get that cached result.
+        Returns: dict of machine_id → prediction dict (same shape as predict()),
+        with prediction_age = readings since the forward pass that produced it.
+        """
+        if not self._loaded:
+            return {}
+
+        ready = [mid for mid in machine_ids
+                 if mid in self.slots and self._fill[self.slots[mid]] >= WINDOW_SIZE]
+        if not ready:
+            return {}
+
+        slots = np.array([self.slots[mid] for mid in ready])
+        hit = self._gate(slots)
+        self.cache_hits += int(hit.sum())
+        self.cache_misses += len(hit) - int(hit.sum())
+        results = {}
+        for mid, slot, reuse in zip(ready, slots, hit):
+            if reuse:
+                results[mid] = {**self._cached[slot], "prediction_age": int(self._count[slot] - self._pred_count[slot])}
+        if hit.all():
+            return results
+        ready = [mid for mid, reuse in zip(ready, hit) if not reuse]
+        slots = slots[~hit]
+
+        # Gather every window into one (N, seq_len, n_features) batch
+        X = self._gather_windows(slots)
 
-        # Prepare input
-        X = np.array(buffer[-WINDOW_SIZE:], dtype=np.float32)
+        # Exact window stats become the gate reference (and reset running-sum drift)
+        X64 = X.astype(np.float64)
+        self._sum[slots] = X64.sum(axis=1)
+        self._sumsq[slots] = (X64 * X64).sum(axis=1)
+        self._ref_mean[slots] = self._sum[slots] / WINDOW_SIZE
+        self._ref_std[slots] = X64.std(axis=1)
+        self._pred_count[slots] = self._count[slots]
 
-        # Normalize using saved scaler params
-        X = (X - self.scaler_mean) / self.scaler_scale
+        # Normalize in place using saved scaler params
+        X -= self.scaler_mean
+        X /= self.scaler_scale
 
-        # Reshape for model: (1, seq_len, n_features)
-        X = X.reshape(1, WINDOW_SIZE, -1)
+        # One forward pass for the whole fleet (avoid Keras splitting into mini-batches)
+        if self._incremental is not None:
+            # Windows are identified by the absolute index of their oldest reading
+            probs = self._incremental.predict(slots, X, self._count[slots] - WINDOW_SIZE)
+        else:
+            probs = self.model.predict(X, batch_size=len(ready), verbose=0)
 
-        # Predict
-        probs = self.model.predict(X, verbose=0)[0]
+        for mid, slot, p in zip(ready, slots, probs):
+            self._cached[slot] = self._format_prediction(p)
+            results[mid] = {**self._cached[slot], "prediction_age": 0}
+        return results
+
+    def predict_all(self):
+        """Run batched inference for every machine that has pushed readings."""
+        return self.predict_many(list(self.slots))
+
+    @staticmethod
+    def _format_prediction(probs):
         predicted_class = int(np.argmax(probs))
         confidence = float(probs[predicted_class])
 
@@ -97,6 +360,11 @@ class PredictiveMaintenanceEngine:
             },
         }
 
+    @property
+    def incremental(self):
+        """True when predictions reuse cached activations (cheap enough to run every tick)."""
+        return self._incremental is not None
+
     @property
     def is_loaded(self):
         return self._loaded
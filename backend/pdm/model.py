@@ -16,10 +16,13 @@ Architecture:
 
 Usage:
   python backend/pdm/model.py
+  python backend/pdm/model.py --stream      # tf.data pipeline over memory-mapped data (larger than RAM)
+  python backend/pdm/model.py --quantize int8   # post-training quantization → pdm_model_int8.tflite
 """
 
 import os
 import sys
+import argparse
 import numpy as np
 
 # Suppress TF verbose logging
@@ -31,16 +34,36 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix
 
+try:
+    from .dataset_store import DatasetStore, csv_to_store
+    from .numpy_model import export as export_numpy
+    from .inference import TFLiteModel
+except ImportError:  # run as a script from backend/pdm
+    from dataset_store import DatasetStore, csv_to_store
+    from numpy_model import export as export_numpy
+    from inference import TFLiteModel
+
 LABEL_NAMES = ["Healthy", "Caution", "Serious", "Critical"]
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(_SCRIPT_DIR, "datasets")
+STORE_DIR = os.path.join(DATA_DIR, "store")
 MODEL_DIR = os.path.join(_SCRIPT_DIR, "saved_model")
 
 
-def load_data():
-    """Load the generated NumPy arrays."""
-    X = np.load(os.path.join(DATA_DIR, "X.npy"))
-    y = np.load(os.path.join(DATA_DIR, "y.npy"))
+def load_data(machine_types=None):
+    """Load the training data, optionally restricted to some machine types.
+
+    Prefers the columnar store (memory-mapped, per-type selection); falls back
+    to X.npy, and otherwise builds the store from the per-type CSVs once.
+    """
+    if not DatasetStore.exists(STORE_DIR) and (machine_types or not os.path.exists(os.path.join(DATA_DIR, "X.npy"))):
+        print(f"Building columnar dataset store from CSVs → {STORE_DIR}")
+        csv_to_store(DATA_DIR, STORE_DIR)
+    if DatasetStore.exists(STORE_DIR):
+        X, y = DatasetStore(STORE_DIR).load(machine_types)
+    else:
+        X = np.load(os.path.join(DATA_DIR, "X.npy"))
+        y = np.load(os.path.join(DATA_DIR, "y.npy"))
     print(f"Loaded data: X={X.shape}, y={y.shape}")
     print(f"Class distribution: {dict(zip(*np.unique(y, return_counts=True)))}")
     return X, y
@@ -71,6 +94,92 @@ def normalize_data(X_train, X_test):
     return X_train, X_test
 
 
+# ─────────────────────────────────────────────
+# Streaming Input Pipeline (tf.data)
+# ─────────────────────────────────────────────
+
+class _ArraySource:
+    """take()/all_labels() over a memory-mapped X.npy / y.npy, matching DatasetStore.
+    X.npy has no machine-type column, so selecting machine types needs the store."""
+
+    def __init__(self, data_dir):
+        self.X = np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r")
+        self.y = np.load(os.path.join(data_dir, "y.npy"))
+        self.seq_len, self.n_features = self.X.shape[1:]
+
+    @staticmethod
+    def _check(machine_types):
+        if machine_types:
+            raise ValueError("Selecting machine types needs the columnar dataset store; "
+                             "build it with dataset_store.py --from-csv")
+
+    def all_labels(self, machine_types=None):
+        self._check(machine_types)
+        return self.y.astype(np.int32)
+
+    def take(self, indices, machine_types=None, dtype=np.float32):
+        self._check(machine_types)
+        return self.X[indices].astype(dtype, copy=False), self.y[indices].astype(np.int32)
+
+
+def open_source(machine_types=None):
+    """Memory-mapped training data: the columnar store if present, else X.npy.
+    As in load_data(), selecting machine types builds the store from the CSVs first."""
+    if DatasetStore.exists(STORE_DIR):
+        return DatasetStore(STORE_DIR)
+    if os.path.exists(os.path.join(DATA_DIR, "X.npy")) and not machine_types:
+        return _ArraySource(DATA_DIR)
+    print(f"Building columnar dataset store from CSVs → {STORE_DIR}")
+    csv_to_store(DATA_DIR, STORE_DIR)
+    return DatasetStore(STORE_DIR)
+
+
+def fit_scaler_streaming(source, indices, chunk_size=8192, machine_types=None):
+    """Per-feature mean / std over the given rows, one chunk at a time.
+
+    Merges float64 chunk moments with Chan et al.'s parallel update, so the
+    result matches StandardScaler on the full array without materializing it.
+    """
+    count, mean, m2 = 0, np.zeros(source.n_features), np.zeros(source.n_features)
+    indices = np.sort(indices)
+    for start in range(0, len(indices), chunk_size):
+        X, _ = source.take(indices[start:start + chunk_size], machine_types, dtype=np.float64)
+        X = X.reshape(-1, source.n_features)
+        n_b, mean_b = len(X), X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        delta = mean_b - mean
+        total = count + n_b
+        mean = mean + delta * n_b / total
+        m2 = m2 + m2_b + delta ** 2 * count * n_b / total
+        count = total
+    scale = np.sqrt(m2 / count)
+    scale[scale == 0.0] = 1.0  # as StandardScaler
+    return mean, scale
+
+
+def make_dataset(source, indices, mean, scale, batch_size=32, shuffle=False, seed=None, machine_types=None):
+    """tf.data pipeline: shuffle indices → batch → parallel memory-mapped gather
+    → on-the-fly normalization → prefetch. Only in-flight batches are in memory."""
+    mean = tf.constant(mean, dtype=tf.float32)
+    scale = tf.constant(scale, dtype=tf.float32)
+
+    def _gather(idx):
+        return source.take(np.sort(idx), machine_types)
+
+    def _load(idx):
+        X, y = tf.numpy_function(_gather, [idx], [tf.float32, tf.int32])
+        X.set_shape([None, source.seq_len, source.n_features])
+        y.set_shape([None])
+        return (X - mean) / scale, y
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if shuffle:
+        ds = ds.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    return (ds.batch(batch_size)
+              .map(_load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+              .prefetch(tf.data.AUTOTUNE))
+
+
 def build_model(input_shape, num_classes=4):
     """Build the 1D CNN architecture."""
     model = models.Sequential([
@@ -169,9 +278,154 @@ def train():
     # Save final model
     model.save(os.path.join(MODEL_DIR, "pdm_model.keras"))
     print(f"\n✅ Model saved to {MODEL_DIR}/pdm_model.keras")
+    export_numpy(model, os.path.join(MODEL_DIR, "pdm_model.npz"))
 
     return model, history
 
 
+def train_streaming(batch_size=32, epochs=80, machine_types=None):
+    """Training pipeline over memory-mapped data via tf.data; X is never loaded whole."""
+    print("=" * 60)
+    print("  HarmonyAura — 1D CNN Predictive Maintenance Training (streaming)")
+    print("=" * 60)
+
+    source = open_source(machine_types)
+    y = source.all_labels(machine_types)
+    print(f"Streaming data: {len(y)} sequences × ({source.seq_len}, {source.n_features})")
+    print(f"Class distribution: {dict(zip(*np.unique(y, return_counts=True)))}")
+
+    # Stratified index splits (same proportions as train(): 20% test, 15% of the rest for validation)
+    all_idx = np.arange(len(y))
+    train_idx, test_idx = train_test_split(all_idx, test_size=0.2, random_state=42, stratify=y)
+    train_idx, val_idx = train_test_split(train_idx, test_size=0.15, random_state=42, stratify=y[train_idx])
+    test_idx = np.sort(test_idx)
+    print(f"\nTrain: {len(train_idx)}, Val: {len(val_idx)}, Test: {len(test_idx)} samples")
+
+    # Scaler statistics from the training rows only, saved for inference
+    mean, scale = fit_scaler_streaming(source, train_idx, machine_types=machine_types)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    np.save(os.path.join(MODEL_DIR, "scaler_mean.npy"), mean)
+    np.save(os.path.join(MODEL_DIR, "scaler_scale.npy"), scale)
+
+    train_ds = make_dataset(source, train_idx, mean, scale, batch_size, shuffle=True, seed=42,
+                            machine_types=machine_types)
+    val_ds = make_dataset(source, val_idx, mean, scale, batch_size, machine_types=machine_types)
+    test_ds = make_dataset(source, test_idx, mean, scale, batch_size, machine_types=machine_types)
+
+    model = build_model((source.seq_len, source.n_features))
+    model.summary()
+
+    cb = [
+        callbacks.EarlyStopping(patience=10, restore_best_weights=True, verbose=1),
+        callbacks.ReduceLROnPlateau(factor=0.5, patience=5, verbose=1),
+        callbacks.ModelCheckpoint(
+            os.path.join(MODEL_DIR, "best_model.keras"),
+            save_best_only=True, verbose=1
+        ),
+    ]
+
+    print("\n🏋️ Training...")
+    history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=cb, verbose=1)
+
+    print("\n📊 Evaluation on Test Set:")
+    test_loss, test_acc = model.evaluate(test_ds, verbose=0)
+    print(f"  Test Accuracy: {test_acc:.4f}")
+    print(f"  Test Loss:     {test_loss:.4f}")
+
+    # test_ds is unshuffled and batches are gathered in sorted order, so labels line up
+    y_test = y[test_idx]
+    y_pred = model.predict(test_ds, verbose=0).argmax(axis=1)
+    print(f"\n{classification_report(y_test, y_pred, target_names=LABEL_NAMES)}")
+    print("Confusion Matrix:")
+    print(confusion_matrix(y_test, y_pred))
+
+    model.save(os.path.join(MODEL_DIR, "pdm_model.keras"))
+    print(f"\n✅ Model saved to {MODEL_DIR}/pdm_model.keras")
+    export_numpy(model, os.path.join(MODEL_DIR, "pdm_model.npz"))
+
+    return model, history
+
+
+# ─────────────────────────────────────────────
+# Post-Training Quantization
+# ─────────────────────────────────────────────
+
+def quantize(mode="int8", calibration_samples=500, machine_types=None):
+    """Convert pdm_model.keras to a quantized TFLite model and compare it on the test split.
+
+    int8: full-integer model (int8 weights, activations and I/O) calibrated on
+    a random sample of training windows; runs on TFLite Micro as well as CPU.
+    float16: float16 weights, float compute. Writes pdm_model_<mode>.tflite.
+    """
+    print("=" * 60)
+    print(f"  HarmonyAura — PdM post-training quantization ({mode})")
+    print("=" * 60)
+
+    model = tf.keras.models.load_model(os.path.join(MODEL_DIR, "pdm_model.keras"))
+    mean = np.load(os.path.join(MODEL_DIR, "scaler_mean.npy")).astype(np.float32)
+    scale = np.load(os.path.join(MODEL_DIR, "scaler_scale.npy")).astype(np.float32)
+
+    # Same split as train(); normalized with the saved scaler the model was trained with
+    X, y = load_data(machine_types)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    X_train = (X_train - mean) / scale
+    X_test = (X_test - mean) / scale
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "int8":
+        calibration = X_train[np.random.default_rng(42).choice(len(X_train),
+                                                               min(calibration_samples, len(X_train)),
+                                                               replace=False)]
+
+        def representative_dataset():
+            for window in calibration:
+                yield [window[None].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+
+    path = os.path.join(MODEL_DIR, f"pdm_model_{mode}.tflite")
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+    # Accuracy delta vs the float model
+    float_pred = model.predict(X_test, batch_size=256, verbose=0).argmax(axis=1)
+    quant_pred = TFLiteModel(path, capacity=len(X_test)).predict(X_test).argmax(axis=1)
+    float_acc = float((float_pred == y_test).mean())
+    quant_acc = float((quant_pred == y_test).mean())
+    keras_size = os.path.getsize(os.path.join(MODEL_DIR, "pdm_model.keras"))
+    print(f"\n📊 Test split ({len(y_test)} samples):")
+    print(f"  {'Float accuracy:':<22}{float_acc:.4f}")
+    print(f"  {mode + ' accuracy:':<22}{quant_acc:.4f}  (Δ {quant_acc - float_acc:+.4f})")
+    print(f"  {'Prediction agreement:':<22}{float((float_pred == quant_pred).mean()):.4f}")
+    print(f"  Size: {os.path.getsize(path) / 1024:.0f} KB (Keras file {keras_size / 1024:.0f} KB)")
+    print(f"\n✅ Quantized model saved to {path}")
+    return {"path": path, "float_accuracy": float_acc, "quantized_accuracy": quant_acc}
+
+
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="HarmonyAura PdM CNN training")
+    parser.add_argument("--stream", action="store_true",
+                        help="tf.data pipeline over memory-mapped data with streaming scaler statistics")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--epochs", type=int, default=80)
+    parser.add_argument("--machine-types", nargs="+", default=None, help="--stream: train on these types only")
+    parser.add_argument("--quantize", choices=["int8", "float16"], default=None,
+                        help="quantize the trained model to TFLite instead of training")
+    parser.add_argument("--calibration-samples", type=int, default=500)
+    args = parser.parse_args()
+    if args.quantize:
+        quantize(args.quantize, calibration_samples=args.calibration_samples, machine_types=args.machine_types)
+    elif args.stream:
+        train_streaming(batch_size=args.batch_size, epochs=args.epochs, machine_types=args.machine_types)
+    else:
+        train()
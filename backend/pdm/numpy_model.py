@@ -0,0 +1,455 @@
+"""
+Predictive Maintenance — NumPy Inference Runtime
+==================================================
+TensorFlow-free forward pass for the 1D CNN built by model.build_model, for
+fast cold starts and small edge containers.
+
+export() reads pdm_model.keras once (this step needs TensorFlow), folds each
+BatchNormalization into the preceding Conv1D and writes the weights plus the
+layer sequence to pdm_model.npz:
+
+  W' = W · γ/√(σ² + ε)        b' = (b − μ) · γ/√(σ² + ε) + β
+
+NumpyCNN loads that file with NumPy alone. IncrementalCNN evaluates the same
+weights on sliding windows, reusing cached conv activations between calls.
+verify() runs both models on the same windows and checks that the
+probabilities agree.
+
+Usage:
+  python backend/pdm/numpy_model.py export
+  python backend/pdm/numpy_model.py verify
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "saved_model")
+KERAS_PATH = os.path.join(MODEL_DIR, "pdm_model.keras")
+NPZ_PATH = os.path.join(MODEL_DIR, "pdm_model.npz")
+ACTIVATIONS = ("linear", "relu", "softmax")
+
+
+# ─────────────────────────────────────────────
+# Export (Keras → folded NumPy weights)
+# ─────────────────────────────────────────────
+
+def _load_keras(model_or_path):
+    if not isinstance(model_or_path, str):
+        return model_or_path
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    return tf.keras.models.load_model(model_or_path)
+
+
+def export(model_or_path=KERAS_PATH, out_path=NPZ_PATH):
+    """Fold BatchNorm into the convolutions and save weights + op list to out_path."""
+    model = _load_keras(model_or_path)
+    ops, arrays = [], {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        cfg = layer.get_config()
+        weights = layer.get_weights()
+        if kind in ("InputLayer", "Dropout"):
+            continue
+        if kind == "Conv1D":
+            if cfg["padding"] != "same" or tuple(cfg["strides"]) != (1,) or tuple(cfg["dilation_rate"]) != (1,):
+                raise ValueError(f"{layer.name}: only stride-1 'same' Conv1D is supported")
+            name = f"conv{sum(op['op'] == 'conv' for op in ops)}"
+            arrays[f"{name}_w"] = weights[0].astype(np.float64)
+            arrays[f"{name}_b"] = (weights[1] if cfg["use_bias"] else np.zeros(cfg["filters"])).astype(np.float64)
+            ops.append({"op": "conv", "name": name, "activation": cfg["activation"]})
+        elif kind == "BatchNormalization":
+            prev = ops[-1] if ops else None
+            if prev is None or prev["op"] != "conv" or prev["activation"] != "linear":
+                raise ValueError(f"{layer.name}: BatchNormalization must follow a linear Conv1D")
+            params = dict(zip([w.name for w in layer.weights], weights))
+            gamma = params.get("gamma", np.ones_like(params["moving_mean"]))
+            beta = params.get("beta", np.zeros_like(params["moving_mean"]))
+            s = gamma / np.sqrt(params["moving_variance"] + cfg["epsilon"])
+            arrays[f"{prev['name']}_w"] *= s
+            arrays[f"{prev['name']}_b"] = (arrays[f"{prev['name']}_b"] - params["moving_mean"]) * s + beta
+        elif kind == "ReLU":
+            if ops and ops[-1]["activation"] == "linear" and ops[-1]["op"] in ("conv", "dense"):
+                ops[-1]["activation"] = "relu"
+            else:
+                ops.append({"op": "relu"})
+        elif kind == "MaxPooling1D":
+            if cfg["padding"] != "valid" or tuple(cfg["strides"]) != tuple(cfg["pool_size"]):
+                raise ValueError(f"{layer.name}: only non-overlapping 'valid' pooling is supported")
+            ops.append({"op": "maxpool", "size": int(cfg["pool_size"][0])})
+        elif kind == "GlobalAveragePooling1D":
+            ops.append({"op": "gap"})
+        elif kind == "Dense":
+            if cfg["activation"] not in ACTIVATIONS:
+                raise ValueError(f"{layer.name}: unsupported activation {cfg['activation']}")
+            name = f"dense{sum(op['op'] == 'dense' for op in ops)}"
+            arrays[f"{name}_w"] = weights[0]
+            arrays[f"{name}_b"] = weights[1] if cfg["use_bias"] else np.zeros(cfg["units"])
+            ops.append({"op": "dense", "name": name, "activation": cfg["activation"]})
+        else:
+            raise ValueError(f"{layer.name}: unsupported layer type {kind}")
+
+    arrays = {k: np.ascontiguousarray(v, dtype=np.float32) for k, v in arrays.items()}
+    np.savez(out_path, ops=np.array(json.dumps(ops)),
+             input_shape=np.array(model.input_shape[1:], dtype=np.int64), **arrays)
+    print(f"[PdM] ✓ NumPy weights exported → {out_path} ({sum(a.nbytes for a in arrays.values()) / 1024:.0f} KB)")
+    return out_path
+
+
+# ─────────────────────────────────────────────
+# Forward Pass
+# ─────────────────────────────────────────────
+
+def _activate(x, activation):
+    if activation == "relu":
+        np.maximum(x, 0.0, out=x)
+    elif activation == "softmax":
+        x -= x.max(axis=-1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+
+def conv1d_valid(x, w, b):
+    """Stride-1 'valid' Conv1D: x (N, L, C_in), w (k, C_in, C_out) → (N, L − k + 1, C_out).
+    One matmul per kernel tap over shifted views."""
+    k = len(w)
+    t = x.shape[1] - k + 1
+    out = x[:, 0:t] @ w[0]
+    for j in range(1, k):
+        out += x[:, j:j + t] @ w[j]
+    out += b
+    return out
+
+
+def _pad(x, left, right):
+    padded = np.zeros((x.shape[0], left + x.shape[1] + right, x.shape[2]), dtype=x.dtype)
+    padded[:, left:left + x.shape[1]] = x
+    return padded
+
+
+def conv1d_same(x, w, b):
+    """Stride-1 'same' Conv1D: x (N, T, C_in) → (N, T, C_out). TF pads the extra column on the right."""
+    k = len(w)
+    return conv1d_valid(_pad(x, (k - 1) // 2, k // 2), w, b)
+
+
+def maxpool1d(x, size):
+    steps = x.shape[1] // size
+    return x[:, :steps * size].reshape(x.shape[0], steps, size, x.shape[2]).max(axis=2)
+
+
+class NumpyCNN:
+    """Folded-BatchNorm CNN evaluated with NumPy; predict() mirrors keras Model.predict."""
+
+    def __init__(self, path=NPZ_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            self.ops = json.loads(str(data["ops"]))
+            self.input_shape = tuple(int(d) for d in data["input_shape"])
+            self.weights = {k: data[k] for k in data.files if k not in ("ops", "input_shape")}
+
+    def predict(self, X, batch_size=None, verbose=0):
+        x = np.asarray(X, dtype=np.float32)
+        for op in self.ops:
+            kind = op["op"]
+            if kind == "conv":
+                x = _activate(conv1d_same(x, self.weights[op["name"] + "_w"], self.weights[op["name"] + "_b"]),
+                              op["activation"])
+            elif kind == "dense":
+                x = _activate(x @ self.weights[op["name"] + "_w"] + self.weights[op["name"] + "_b"],
+                              op["activation"])
+            elif kind == "relu":
+                x = np.maximum(x, 0.0)
+            elif kind == "maxpool":
+                x = maxpool1d(x, op["size"])
+            elif kind == "gap":
+                x = x.mean(axis=1)
+        return x
+
+
+# ─────────────────────────────────────────────
+# Incremental Sliding-Window Inference
+# ─────────────────────────────────────────────
+
+_INVALID = -(1 << 62)
+
+
+class IncrementalCNN:
+    """Sliding-window evaluation of a NumpyCNN that reuses per-timestep conv activations.
+
+    Away from the window edges a conv output depends only on the readings at
+    fixed absolute times, so it is cached per slot in a ring keyed by absolute
+    time and computed once, when it first enters the window. Only the few
+    positions whose receptive field reaches a window edge (where 'same' zero
+    padding applies) are recomputed on every call. After a stride-s pooling,
+    keys advance by s per cell and each window phase (start mod s) forms its
+    own cached stream. Global average pooling keeps a running sum of the cached
+    interior of the last conv per phase, re-summed every `resum` updates.
+
+    Supports conv/maxpool stacks followed by gap and dense layers (build_model).
+    """
+
+    def __init__(self, runtime, window_size, capacity=64, resum=1024):
+        self.window_size = window_size
+        self.ring = 1 << window_size.bit_length()  # power of two > window: a multiple of every stride
+        self.resum = resum
+        self.capacity = 0
+        self.levels = []  # conv layers, with their window geometry
+        self.head = []    # dense layers after gap
+        n, stride, margin_l, margin_r = window_size, 1, 0, 0
+        stage = "features"
+        for op in runtime.ops:
+            kind = op["op"]
+            if stage == "features" and kind == "conv":
+                w, b = runtime.weights[op["name"] + "_w"], runtime.weights[op["name"] + "_b"]
+                left, right = (len(w) - 1) // 2, len(w) // 2
+                margin_l, margin_r = margin_l + left, margin_r + right
+                self.levels.append({"op": "conv", "w": w, "b": b, "activation": op["activation"],
+                                    "left": left, "right": right, "n": n, "stride": stride,
+                                    "lo": margin_l, "hi": n - 1 - margin_r})
+            elif stage == "features" and kind == "maxpool":
+                size = op["size"]
+                n_out = n // size
+                last = (n - 1 - margin_r - (size - 1)) // size
+                margin_l, margin_r = -(-margin_l // size), n_out - 1 - last
+                n, stride = n_out, stride * size
+                self.levels.append({"op": "maxpool", "size": size})
+            elif stage == "features" and kind == "gap":
+                stage = "head"
+            elif stage == "head" and kind == "dense":
+                self.head.append((runtime.weights[op["name"] + "_w"], runtime.weights[op["name"] + "_b"],
+                                  op["activation"]))
+            else:
+                raise ValueError(f"Incremental inference does not support op {kind!r} here")
+        convs = [lv for lv in self.levels if lv["op"] == "conv"]
+        if stage != "head" or not convs or self.levels[-1]["op"] != "conv" or any(lv["lo"] > lv["hi"] for lv in convs):
+            raise ValueError("Incremental inference needs conv layers with an interior, ending in gap")
+        self._convs = convs
+        self._gap = convs[-1]
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        for lv in self._convs:
+            r = lv["stride"]
+            add = {
+                "cache": np.zeros((extra, self.ring, len(lv["b"])), dtype=np.float32),
+                "valid_lo": np.full((extra, r), _INVALID, dtype=np.int64),  # cached keys: [valid_lo, valid_hi]
+                "valid_hi": np.full((extra, r), _INVALID, dtype=np.int64),
+            }
+            for key, arr in add.items():
+                lv[key] = arr if self.capacity == 0 else np.concatenate([lv[key], arr])
+        r = self._gap["stride"]
+        add = {
+            "gap_sum": np.zeros((extra, r, len(self._gap["b"])), dtype=np.float64),
+            "gap_lo": np.full((extra, r), _INVALID, dtype=np.int64),
+            "gap_hi": np.full((extra, r), _INVALID, dtype=np.int64),
+            "gap_updates": np.zeros((extra, r), dtype=np.int64),
+        }
+        for key, arr in add.items():
+            setattr(self, key, arr if self.capacity == 0 else np.concatenate([getattr(self, key), arr]))
+        self.capacity = capacity
+
+    def reset(self, slots):
+        """Forget cached activations for slots (e.g. when their readings are replaced)."""
+        for lv in self._convs:
+            lv["valid_lo"][slots] = _INVALID
+            lv["valid_hi"][slots] = _INVALID
+        self.gap_lo[slots] = _INVALID
+        self.gap_hi[slots] = _INVALID
+
+    def predict(self, slots, X, starts):
+        """Probabilities for normalized windows X (N, window, features).
+
+        slots: per-row cache slot; starts: absolute time (reading count) of
+        each window's oldest reading. Rows sharing a start and cache state are
+        evaluated as one batch.
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        starts = np.asarray(starts, dtype=np.int64)
+        if len(slots) and slots.max() >= self.capacity:
+            self._grow(max(int(slots.max()) + 1, 2 * self.capacity))
+
+        columns = [starts]
+        for lv in self._convs:
+            phase = starts % lv["stride"]
+            columns += [lv["valid_lo"][slots, phase], lv["valid_hi"][slots, phase]]
+        phase = starts % self._gap["stride"]
+        columns += [self.gap_lo[slots, phase], self.gap_hi[slots, phase]]
+        state = np.stack(columns, axis=1)
+        if len(state) and (state == state[0]).all():  # usual case: the whole fleet in lockstep
+            return self._predict_group(slots, np.asarray(X, dtype=np.float32), int(starts[0]))
+        _, group = np.unique(state, axis=0, return_inverse=True)
+        group = group.ravel()
+
+        out = None
+        for g in range(group.max() + 1 if len(group) else 0):
+            rows = np.flatnonzero(group == g)
+            probs = self._predict_group(slots[rows], np.asarray(X[rows], dtype=np.float32), int(starts[rows[0]]))
+            if out is None:
+                out = np.empty((len(slots), probs.shape[1]), dtype=np.float32)
+            out[rows] = probs
+        return out
+
+    def _ring_read(self, cache, rows, key_first, key_last, r):
+        """cache[rows] at keys key_first, key_first + r, …, key_last: one or two ring slices."""
+        ring = self.ring
+        pos, end = key_first % ring, key_first % ring + (key_last - key_first) + 1
+        if end <= ring:
+            return cache[rows, pos:end:r]
+        wrap = (ring - pos - 1) // r + 1  # keys before the wrap
+        return np.concatenate([cache[rows, pos::r], cache[rows, pos + wrap * r - ring:end - ring:r]], axis=1)
+
+    def _ring_write(self, cache, rows, key_first, values, r):
+        ring = self.ring
+        pos, end = key_first % ring, key_first % ring + r * (values.shape[1] - 1) + 1
+        if end <= ring:
+            cache[rows, pos:end:r] = values
+            return
+        wrap = (ring - pos - 1) // r + 1
+        cache[rows, pos::r] = values[:, :wrap]
+        cache[rows, pos + wrap * r - ring:end - ring:r] = values[:, wrap:]
+
+    def _first_missing(self, lv, slots, start):
+        """(first interior index not cached yet, valid_lo after this call) for a conv level."""
+        r = lv["stride"]
+        phase = start % r
+        key_lo, key_hi = start + r * lv["lo"], start + r * lv["hi"]
+        cached_lo, cached_hi = int(lv["valid_lo"][slots[0], phase]), int(lv["valid_hi"][slots[0], phase])
+        if cached_lo <= key_lo and key_lo - r <= cached_hi <= key_hi and cached_hi - self.ring < key_lo:
+            return max(lv["lo"], (cached_hi - start) // r + 1), cached_lo
+        return lv["lo"], key_lo
+
+    def _conv_level(self, lv, slots, rows, x_at, start, first, valid_lo):
+        """Compute the not-yet-cached interior into lv's cache, plus both edges
+        (zero padding reaches their receptive field, so they change every call)."""
+        r, lo, hi = lv["stride"], lv["lo"], lv["hi"]
+        if first <= hi:
+            fresh = _activate(conv1d_valid(x_at(first - lv["left"], hi + lv["right"] + 1), lv["w"], lv["b"]),
+                              lv["activation"])
+            self._ring_write(lv["cache"], rows, start + r * first, fresh, r)
+        phase = start % r
+        lv["valid_lo"][slots, phase] = valid_lo
+        lv["valid_hi"][slots, phase] = start + r * hi
+
+        left_edge = _activate(conv1d_valid(_pad(x_at(0, lo + lv["right"]), lv["left"], 0), lv["w"], lv["b"]),
+                              lv["activation"])
+        right_edge = _activate(conv1d_valid(_pad(x_at(hi + 1 - lv["left"], lv["n"]), 0, lv["right"]),
+                                            lv["w"], lv["b"]), lv["activation"])
+        return left_edge, right_edge
+
+    def _assemble(self, lv, rows, start, left_edge, right_edge, a, b):
+        """Activations at window positions [a, b) from the edges and the cached interior."""
+        lo, hi, r = lv["lo"], lv["hi"], lv["stride"]
+        parts = []
+        if a < lo:
+            parts.append(left_edge[:, a:min(b, lo)])
+        if max(a, lo) < min(b, hi + 1):
+            parts.append(self._ring_read(lv["cache"], rows, start + r * max(a, lo), start + r * (min(b, hi + 1) - 1), r))
+        if b > hi + 1:
+            parts.append(right_edge[:, max(a, hi + 1) - hi - 1:b - hi - 1])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+
+    def _gap_interior(self, slots, rows, start):
+        """Running sum of the last conv's cached interior for this window (float64)."""
+        lv = self._gap
+        r = lv["stride"]
+        phase = start % r
+        key_lo, key_hi = start + r * lv["lo"], start + r * lv["hi"]
+        prev_lo, prev_hi = int(self.gap_lo[slots[0], phase]), int(self.gap_hi[slots[0], phase])
+        if (prev_lo <= key_lo and key_lo - r <= prev_hi <= key_hi and prev_lo > key_hi - self.ring
+                and self.gap_updates[slots, phase].max() < self.resum):
+            total = self.gap_sum[slots, phase]
+            if prev_hi < key_hi:
+                total += self._ring_read(lv["cache"], rows, prev_hi + r, key_hi, r).sum(axis=1)
+            if prev_lo < key_lo:
+                total -= self._ring_read(lv["cache"], rows, prev_lo, key_lo - r, r).sum(axis=1)
+            self.gap_updates[slots, phase] += 1
+        else:
+            total = self._ring_read(lv["cache"], rows, key_lo, key_hi, r).sum(axis=1, dtype=np.float64)
+            self.gap_updates[slots, phase] = 0
+        self.gap_sum[slots, phase] = total
+        self.gap_lo[slots, phase] = key_lo
+        self.gap_hi[slots, phase] = key_hi
+        return total
+
+    def _predict_group(self, slots, x, start):
+        # A contiguous run of slots (the usual whole-fleet case) reads the caches through basic slices
+        contiguous = np.array_equal(slots, np.arange(slots[0], slots[0] + len(slots)))
+        rows = slice(slots[0], slots[0] + len(slots)) if contiguous else slots
+        firsts = [self._first_missing(lv, slots, start) if lv["op"] == "conv" else None for lv in self.levels]
+
+        # Each conv reads only its edges and its fresh tail from its input: (head length, tail start)
+        needs = [None] * len(self.levels)
+        for i in reversed(range(len(self.levels))):
+            lv = self.levels[i]
+            if lv["op"] == "conv":
+                needs[i] = (lv["lo"] + lv["right"], min(lv["hi"] + 1, firsts[i][0]) - lv["left"])
+            else:
+                needs[i] = (needs[i + 1][0] * lv["size"], needs[i + 1][1] * lv["size"])
+
+        head = tail = x  # the level input, kept only at positions [0, len(head)) and [tail_start, n)
+        tail_start = 0
+
+        def x_at(a, b):
+            return tail[:, a - tail_start:b - tail_start] if a >= tail_start else head[:, a:b]
+
+        for i, lv in enumerate(self.levels):
+            if lv["op"] == "maxpool":
+                head, tail, tail_start = maxpool1d(head, lv["size"]), maxpool1d(tail, lv["size"]), tail_start // lv["size"]
+                continue
+            left_edge, right_edge = self._conv_level(lv, slots, rows, x_at, start, *firsts[i])
+            if lv is self._gap:
+                total = self._gap_interior(slots, rows, start) + left_edge.sum(axis=1) + right_edge.sum(axis=1)
+                x = (total / lv["n"]).astype(np.float32)
+                break
+            head_len, tail_start = needs[i + 1]
+            if tail_start <= head_len:
+                head = tail = self._assemble(lv, rows, start, left_edge, right_edge, 0, lv["n"])
+                tail_start = 0
+            else:
+                head = self._assemble(lv, rows, start, left_edge, right_edge, 0, head_len)
+                tail = self._assemble(lv, rows, start, left_edge, right_edge, tail_start, lv["n"])
+        for w, b, activation in self.head:
+            x = _activate(x @ w + b, activation)
+        return x
+
+
+# ─────────────────────────────────────────────
+# Parity Check
+# ─────────────────────────────────────────────
+
+def verify(keras_path=KERAS_PATH, npz_path=NPZ_PATH, n=512, atol=1e-4, seed=0):
+    """Compare Keras and NumPy probabilities on n standardized random windows.
+    Returns True when every probability is within atol and every argmax agrees."""
+    model = _load_keras(keras_path)
+    runtime = NumpyCNN(npz_path)
+    X = np.random.default_rng(seed).standard_normal((n,) + runtime.input_shape).astype(np.float32)
+    expected = model.predict(X, batch_size=n, verbose=0)
+    actual = runtime.predict(X)
+    max_diff = float(np.abs(expected - actual).max())
+    agree = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean())
+    ok = max_diff <= atol and agree == 1.0
+    print(f"[PdM] {'✓' if ok else '✗'} NumPy vs Keras on {n} windows: max |Δp| = {max_diff:.2e} "
+          f"(atol {atol:.0e}), argmax agreement {agree:.1%}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export / verify the NumPy PdM runtime")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--model", default=KERAS_PATH)
+    parser.add_argument("--out", default=NPZ_PATH)
+    parser.add_argument("--samples", type=int, default=512)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args.model, args.out)
+    else:
+        sys.exit(0 if verify(args.model, args.out, n=args.samples, atol=args.atol) else 1)
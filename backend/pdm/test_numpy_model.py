@@ -0,0 +1,86 @@
+"""
+Parity tests for the NumPy PdM runtime: NumpyCNN against the Keras model it
+was exported from, and IncrementalCNN against a full NumpyCNN pass.
+
+  python -m pytest backend/pdm/test_numpy_model.py
+"""
+
+import numpy as np
+import pytest
+
+try:
+    from .numpy_model import KERAS_PATH, NPZ_PATH, IncrementalCNN, NumpyCNN, _load_keras
+except ImportError:
+    from numpy_model import KERAS_PATH, NPZ_PATH, IncrementalCNN, NumpyCNN, _load_keras  # run from backend/pdm
+
+INCREMENTAL_ATOL = 1e-5
+
+
+@pytest.fixture(scope="module")
+def runtime():
+    return NumpyCNN(NPZ_PATH)
+
+
+def _stream(runtime, n, length, seed):
+    window, features = runtime.input_shape
+    return np.random.default_rng(seed).standard_normal((n, length, features)).astype(np.float32)
+
+
+def test_numpy_matches_keras(runtime):
+    pytest.importorskip("tensorflow")
+    model = _load_keras(KERAS_PATH)
+    X = np.random.default_rng(0).standard_normal((256,) + runtime.input_shape).astype(np.float32)
+    expected = model.predict(X, batch_size=len(X), verbose=0)
+    actual = runtime.predict(X)
+    np.testing.assert_allclose(actual, expected, atol=1e-4)
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_incremental_sliding_and_skipped_windows(runtime):
+    window = runtime.input_shape[0]
+    stream = _stream(runtime, 16, 900, seed=1)
+    inc = IncrementalCNN(runtime, window, capacity=4, resum=50)  # grows; re-sums often
+    slots = np.arange(len(stream))
+    # Steps of 1 slide the window; larger steps skip readings (70 > window: no overlap at all)
+    steps = [1, 1, 5, 2, 3, 70]
+    end, i = window, 0
+    while end <= stream.shape[1]:
+        X = stream[:, end - window:end]
+        got = inc.predict(slots, X, np.full(len(slots), end - window))
+        np.testing.assert_allclose(got, runtime.predict(X), atol=INCREMENTAL_ATOL)
+        end += steps[i % len(steps)]
+        i += 1
+
+
+def test_incremental_desynced_windows(runtime):
+    window = runtime.input_shape[0]
+    n = 24
+    stream = _stream(runtime, n, 400, seed=2)
+    rng = np.random.default_rng(3)
+    inc = IncrementalCNN(runtime, window)
+    slots = np.arange(n)
+    starts = rng.integers(0, 100, n)
+    for _ in range(40):
+        # Every slot advances on its own schedule, so rows fall into mixed cache states
+        starts = np.minimum(starts + rng.choice([0, 1, 1, 2, 7, 61], n), stream.shape[1] - window)
+        X = np.stack([stream[s, t:t + window] for s, t in zip(slots, starts)])
+        got = inc.predict(slots, X, starts)
+        np.testing.assert_allclose(got, runtime.predict(X), atol=INCREMENTAL_ATOL)
+
+    # A subset of slots, out of order
+    subset = rng.permutation(n)[:7]
+    X = np.stack([stream[s, t:t + window] for s, t in zip(subset, starts[subset])])
+    np.testing.assert_allclose(inc.predict(subset, X, starts[subset]), runtime.predict(X), atol=INCREMENTAL_ATOL)
+
+
+def test_incremental_reset_replaced_readings(runtime):
+    window = runtime.input_shape[0]
+    first, second = _stream(runtime, 8, window + 10, seed=4), _stream(runtime, 8, window + 10, seed=5)
+    inc = IncrementalCNN(runtime, window)
+    slots = np.arange(8)
+    starts = np.full(8, 10)
+    inc.predict(slots, first[:, 10:], starts)
+    # Same absolute times, different readings (e.g. a machine slot reassigned)
+    inc.reset(slots)
+    X = second[:, 10:]
+    np.testing.assert_allclose(inc.predict(slots, X, starts), runtime.predict(X), atol=INCREMENTAL_ATOL)
@@ -0,0 +1,281 @@
+"""
+Delta Publisher
+================
+Coalesces all per-tick Firebase writes into a single multi-path `update()`
+at the site root, sending only the leaf fields that changed since the last
+published snapshot.
+
+Numeric leaves can carry a per-field deadband (e.g. coolant_temp 0.1): a new
+value is only published once it has moved at least that far from the value
+clients last received, so sensor jitter does not cost write quota. Fields
+listed as reset fields (counters such as prediction_age) only apply the
+deadband to increases: any decrease, e.g. a reset to 0, is published at once.
+
+BackgroundPublisher moves the network round trip off the simulation thread:
+the tick only enqueues the update dict, and a daemon thread drains a bounded
+queue with an explicit overflow policy.
+
+One-shot writes (command acks, alert log entries) are staged with stage_once():
+they replace the node at their path, skip the diff and are restaged whenever
+the uplink reports them lost, until the write that carried them has been
+acknowledged.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+def _flatten(prefix, field, value, out):
+    """Flatten nested dicts into (path, field, leaf) triples. Lists are leaves; empty dicts are skipped."""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            _flatten(f"{prefix}/{key}", key, child, out)
+    else:
+        out.append((prefix, field, value))
+    return out
+
+
+def _set_in(node, keys, value):
+    """Copy of `node` with `value` written at the nested `keys` (None deletes; empty nodes become None)."""
+    node = dict(node) if isinstance(node, dict) else {}
+    key = keys[0]
+    child = value if len(keys) == 1 else _set_in(node.get(key), keys[1:], value)
+    if child is None:
+        node.pop(key, None)
+    else:
+        node[key] = child
+    return node or None
+
+
+_MISSING = object()
+
+
+class DeltaPublisher:
+    """Diffs staged entity state against the last published snapshot."""
+
+    def __init__(self, site_ref, deadbands=None, reset_fields=()):
+        self.site_ref = site_ref
+        self.deadbands = dict(deadbands or {})  # leaf field name → minimum change
+        self.reset_fields = frozenset(reset_fields)  # deadband fields whose decreases always publish
+        self._published = {}  # path → last value sent
+        self._pending = {}    # path → value to send on next flush
+        self._once = {}       # one-shot path → [value, uplink ticket of the write carrying it]
+
+        # Counters
+        self.paths_sent = 0
+        self.paths_suppressed = 0
+        self.flushes = 0
+
+    def stage(self, path, data):
+        """Stage `data` (a leaf or nested dict) at `path`, keeping only changed leaves."""
+        published = self._published
+        pending = self._pending
+        deadbands = self.deadbands
+        for leaf_path, field, value in _flatten(path, path.rsplit("/", 1)[-1], data, []):
+            last = published.get(leaf_path, _MISSING)
+            if last is _MISSING:
+                changed = True
+            elif value == last and type(value) is type(last):
+                changed = False
+            else:
+                changed = self._exceeds_deadband(deadbands.get(field), value, last, field in self.reset_fields)
+            if changed:
+                pending[leaf_path] = value
+            else:
+                pending.pop(leaf_path, None)
+                self.paths_suppressed += 1
+
+    def stage_once(self, path, value):
+        """Stage a write of `value` at `path` that no later tick repeats (e.g. a command ack).
+
+        The value replaces the node at `path` and bypasses the diff. It is kept
+        for retry until the write carrying it is confirmed, so an overflow drop
+        or a failed write cannot lose it. While a write to an ancestor is still
+        unconfirmed the value is folded into that node instead, so no update
+        ever carries both a path and one of its ancestors.
+        """
+        once = self._once
+        keys = path.split("/")
+        for i in range(1, len(keys)):
+            entry = once.get("/".join(keys[:i]))
+            if entry is not None:
+                ancestor = "/".join(keys[:i])
+                node = _set_in(entry[0], keys[i:], value)
+                self._pending[ancestor] = node
+                once[ancestor] = [node, None]
+                return
+        prefix = path + "/"
+        for stale in [p for p in once if p.startswith(prefix)]:
+            del once[stale]
+        for stale in [p for p in self._pending if p.startswith(prefix)]:
+            del self._pending[stale]
+        self._pending[path] = value
+        once[path] = [value, None]
+
+    @staticmethod
+    def _exceeds_deadband(band, value, last, reset=False):
+        if (band and isinstance(value, (int, float)) and isinstance(last, (int, float))
+                and not isinstance(value, bool)):
+            if reset and value < last:
+                return True
+            # Small epsilon so values rounded to the band (e.g. 0.1) still publish
+            return abs(value - last) + 1e-9 >= band
+        return True
+
+    def flush(self):
+        """Send every pending leaf in one multi-path update. Returns the number of paths sent."""
+        # Read the acknowledged ticket before popping losses: anything lost at or
+        # below it is already in the lost set, so the rest of it was written
+        settled = getattr(self.site_ref, "settled", None)
+        settled = settled() if settled else None
+        # Paths the sink dropped or failed to write must be re-sent on the next change
+        pop_lost = getattr(self.site_ref, "pop_lost_paths", None)
+        if pop_lost:
+            self.forget(pop_lost())
+        if settled is not None and self._once:
+            self._once = {path: entry for path, entry in self._once.items()
+                          if entry[1] is None or entry[1] > settled}
+        if not self._pending:
+            return 0
+        updates, self._pending = self._pending, {}
+        ticket = self.site_ref.update(updates)
+        self._published.update(updates)
+        for path in self._once.keys() & updates.keys():
+            self._published.pop(path, None)  # never diffed, so not worth remembering
+            if ticket is None:
+                del self._once[path]  # synchronous sink: update() returning means written
+            else:
+                self._once[path][1] = ticket
+        self.paths_sent += len(updates)
+        self.flushes += 1
+        return len(updates)
+
+    def forget(self, paths):
+        """Drop published values for `paths` so they are re-sent on the next stage().
+
+        One-shot paths are restaged immediately, since no later stage() will carry them.
+        """
+        for path in paths:
+            self._published.pop(path, None)
+            entry = self._once.get(path)
+            if entry is not None:
+                self._pending.setdefault(path, entry[0])
+                entry[1] = None
+
+    def resync(self):
+        """Forget the published snapshot so the next flush resends full state."""
+        self._published.clear()
+
+
+class BackgroundPublisher:
+    """Bounded-queue sink that performs `update()` calls on a background thread.
+
+    Overflow policies (applied when the queue is full at enqueue time):
+      - "coalesce":    merge the new update into the newest queued one
+                       (latest value per path wins, nothing is lost)
+      - "drop_oldest": discard the oldest queued update; its paths are
+                       reported through pop_lost_paths() so they get re-sent
+
+    update() returns a ticket; settled() is the highest ticket whose write has
+    finished (failures are reported through pop_lost_paths() before it advances).
+    """
+
+    POLICIES = ("coalesce", "drop_oldest")
+
+    def __init__(self, site_ref, max_queue=32, policy="coalesce"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.site_ref = site_ref
+        self.max_queue = max_queue
+        self.policy = policy
+        self._queue = deque()  # (enqueued_at, ticket, updates)
+        self._lost = set()
+        self._ticket = 0
+        self._settled = 0
+        self._cond = threading.Condition()
+        self._running = True
+
+        # Counters
+        self.published = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_latency_s = 0.0
+        self.max_latency_s = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="publisher", daemon=True)
+        self._thread.start()
+
+    def update(self, updates):
+        """Enqueue a multi-path update and return its ticket. Never blocks on the network."""
+        with self._cond:
+            self._ticket += 1
+            if len(self._queue) >= self.max_queue:
+                if self.policy == "coalesce":
+                    enqueued_at, _, newest = self._queue[-1]
+                    newest.update(updates)
+                    self._queue[-1] = (enqueued_at, self._ticket, newest)
+                    self.coalesced += 1
+                    return self._ticket
+                _, _, oldest = self._queue.popleft()
+                self._lost.update(oldest)
+                self.dropped += 1
+            self._queue.append((time.time(), self._ticket, dict(updates)))
+            self._cond.notify()
+            return self._ticket
+
+    def settled(self):
+        """Highest ticket whose write has completed (successfully or reported lost)."""
+        with self._cond:
+            return self._settled
+
+    def pop_lost_paths(self):
+        """Return (and clear) the paths whose values never reached the database."""
+        with self._cond:
+            lost, self._lost = self._lost, set()
+        return lost
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "published": self.published,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "last_latency_ms": round(self.last_latency_s * 1000, 1),
+            "max_latency_ms": round(self.max_latency_s * 1000, 1),
+        }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                enqueued_at, ticket, updates = self._queue.popleft()
+            try:
+                self.site_ref.update(updates)
+                self.published += 1
+            except Exception as e:
+                self.errors += 1
+                with self._cond:
+                    self._lost.update(updates)
+                print(f"\nError pushing to Firebase: {e}")
+            with self._cond:
+                self._settled = ticket
+            # Latency: enqueue → write acknowledged (includes queueing delay)
+            self.last_latency_s = time.time() - enqueued_at
+            self.max_latency_s = max(self.max_latency_s, self.last_latency_s)
+
+    def stop(self, timeout=5.0):
+        """Drain the remaining queue and stop the background thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
@@ -1,44 +1,57 @@
 import time
-import firebase_admin
-from firebase_admin import credentials, db
-from config import FIREBASE_CREDENTIALS_PATH, FIREBASE_DB_URL, SIMULATION_FREQUENCY, NUM_WORKERS, MACHINE_TYPES
+from config import (SIMULATION_FREQUENCY, NUM_WORKERS, NUM_MACHINES, MACHINE_TYPES, PUBLISH_DEADBANDS,
+                    PUBLISH_RESET_FIELDS, PUBLISH_QUEUE_SIZE, PUBLISH_OVERFLOW_POLICY, PUBLISH_STATS_INTERVAL, ALERT_MODE,
+                    ALERT_EVAL_INTERVAL)
 from models import Machine, Worker, SiteEnvironment
+from publisher import DeltaPublisher, BackgroundPublisher
+from sinks import create_sink
+from clock import SYSTEM_CLOCK, SimulatedClock
+import argparse
 import random
-import os
 import json
 
-# Predictive Maintenance Engine
-try:
-    from pdm.inference import PredictiveMaintenanceEngine
-    PDM_AVAILABLE = True
-except ImportError:
-    PDM_AVAILABLE = False
-    print("[PdM] Predictive Maintenance module not available.")
-
 # Actionable Alerts Engine
-from alerts_engine import ActionableAlertsEngine
+from alerts_engine import ActionableAlertsEngine, AlertLog
+
+def start_pdm_engine(n_machines, background=True):
+    """Import the PdM backend lazily (after sink init) and load its model.
 
-def initialize_firebase():
+    In background mode loading and warm-up run on a thread while the simulation
+    ticks; the engine buffers readings from the start and only predicts once
+    is_loaded. Returns the engine, or None when PdM is unavailable.
+    """
     try:
-        if not os.path.exists(FIREBASE_CREDENTIALS_PATH):
-            print(f"Warning: Firebase credentials not found at {FIREBASE_CREDENTIALS_PATH}")
-            print("Using mock mode (printing to console instead of Firebase)")
-            return None
-
-        cred = credentials.Certificate(FIREBASE_CREDENTIALS_PATH)
-        firebase_admin.initialize_app(cred, {
-            'databaseURL': FIREBASE_DB_URL
-        })
-        print("Firebase initialized successfully.")
-        return db.reference('site')
-    except Exception as e:
-        print(f"Failed to initialize Firebase: {e}")
+        from pdm.inference import PredictiveMaintenanceEngine
+    except ImportError:
+        print("[PdM] Predictive Maintenance module not available.")
         return None
 
+    def _report(ok):
+        if ok:
+            print("[PdM] ✅ Predictive Maintenance engine ready.")
+        else:
+            print("[PdM] ⚠️  Running without predictive maintenance.")
+
+    engine = PredictiveMaintenanceEngine(n_machines=n_machines)
+    if background:
+        engine.load_async(on_done=_report)
+        return engine
+    ok = engine.load(warm_up=True)
+    _report(ok)
+    return engine if ok else None
+
+
+def initialize_sink():
+    """Open the configured telemetry sink and return a reference to 'site' (None = mock mode)."""
+    sink = create_sink()
+    return sink.reference('site') if sink else None
+
 
 class EscalationManager:
-    def __init__(self, db_ref):
+    def __init__(self, db_ref, clock=None, num_workers=NUM_WORKERS):
         self.db_ref = db_ref
+        self.clock = clock or SYSTEM_CLOCK
+        self.num_workers = num_workers
         self.is_active = False
         self.start_time = 0
         self.needs_reset = False
@@ -62,13 +75,13 @@ class EscalationManager:
             return
         print("\n[RISK ESCALATION] ===== ACTIVATED =====")
         self.is_active = True
-        self.start_time = time.time()
+        self.start_time = self.clock.time()
         self.notified_workers.clear()
         self.target_profiles.clear()
 
-        # Pick exactly 5 random targets from NUM_WORKERS
-        all_ids = [f"W{i+1}" for i in range(NUM_WORKERS)]
-        targets = random.sample(all_ids, 5)
+        # Pick 5 random targets from the workforce (all of it on smaller sites)
+        all_ids = [f"W{i+1}" for i in range(self.num_workers)]
+        targets = random.sample(all_ids, min(5, self.num_workers))
 
         # First 2 -> Critical path, remaining 3 -> Warning path
         self.critical_targets = targets[:2]
@@ -112,7 +125,7 @@ class EscalationManager:
             return 0.0  # Not a target
 
         # Effective elapsed time with per-worker offset
-        raw_elapsed = time.time() - self.start_time
+        raw_elapsed = self.clock.time() - self.start_time
         elapsed = max(0, raw_elapsed + prof["time_offset"])
         severity = prof["severity"]
         noise = random.uniform(-prof["noise_amp"], prof["noise_amp"])
@@ -145,6 +158,15 @@ class EscalationManager:
         else:
             return 0.0
 
+    def get_factors(self):
+        """
+        Returns {worker_id: escalation_factor} for every escalation target,
+        computed once per tick. Workers not in the dict have a factor of 0.0.
+        """
+        if not self.is_active:
+            return {}
+        return {wid: self.get_factor(wid) for wid in self.target_profiles}
+
     def _send_notification(self, worker_id):
         if not self.db_ref:
             return
@@ -154,9 +176,10 @@ class EscalationManager:
             "Biometric Stress Threshold Exceeded",
             "Rapid HRV Deterioration"
         ]
+        now = self.clock.time()
         notification = {
-            "id": f"alert-{int(time.time() * 1000)}",
-            "timestamp": time.time() * 1000,
+            "id": f"alert-{int(now * 1000)}",
+            "timestamp": now * 1000,
             "type": "CRITICAL",
             "message": f"Worker {worker_id} Critical: {random.choice(reasons)}",
             "worker_id": worker_id
@@ -183,8 +206,24 @@ WORKER_MACHINE_MAP = {
 }
 
 
-def main():
-    site_ref = initialize_firebase()
+def build_machine_index(workers):
+    """Group worker IDs by assigned machine: {machine_id: [worker_id, ...]}.
+    Rebuild whenever worker → machine assignments change."""
+    index = {}
+    for wid, w in workers.items():
+        index.setdefault(w.assigned_machine_id, []).append(wid)
+    return index
+
+
+def main(fast_forward_ticks=None):
+    """Run the site simulation.
+
+    With fast_forward_ticks=N the loop runs N ticks headless on a SimulatedClock,
+    advancing simulated time by one tick period per iteration without sleeping.
+    """
+    fast_forward = fast_forward_ticks is not None
+    clock = SimulatedClock() if fast_forward else SYSTEM_CLOCK
+    site_ref = initialize_sink()
 
     # Clear stale state on startup
     if site_ref:
@@ -193,20 +232,26 @@ def main():
         site_ref.child('events/escalation_active').set(False)
         site_ref.child('events/escalation_progress').set(0)
 
-    escalation_mgr = EscalationManager(site_ref)
+    escalation_mgr = EscalationManager(site_ref, clock=clock)
 
-    # Initialize Predictive Maintenance Engine
-    pdm_engine = None
-    if PDM_AVAILABLE:
-        pdm_engine = PredictiveMaintenanceEngine()
-        if pdm_engine.load():
-            print("[PdM] ✅ Predictive Maintenance engine ready.")
-        else:
-            pdm_engine = None
-            print("[PdM] ⚠️  Running without predictive maintenance.")
+    # All per-tick state goes out as one delta-only multi-path update,
+    # written on a background thread so a slow round trip never stretches the tick
+    publisher = None
+    if site_ref and fast_forward:
+        # Headless: write synchronously so every simulated tick reaches the sink
+        publisher = DeltaPublisher(site_ref, deadbands=PUBLISH_DEADBANDS, reset_fields=PUBLISH_RESET_FIELDS)
+    elif site_ref:
+        uplink = BackgroundPublisher(site_ref, max_queue=PUBLISH_QUEUE_SIZE, policy=PUBLISH_OVERFLOW_POLICY)
+        publisher = DeltaPublisher(uplink, deadbands=PUBLISH_DEADBANDS, reset_fields=PUBLISH_RESET_FIELDS)
+
+    # Predictive Maintenance: loads + warms up in the background in real time
+    # (telemetry starts immediately); synchronously when fast-forwarding, for determinism
+    pdm_engine = start_pdm_engine(NUM_MACHINES, background=not fast_forward)
 
     # Initialize Actionable Alerts Engine
-    alerts_engine = ActionableAlertsEngine()
+    alerts_engine = ActionableAlertsEngine(clock=clock, sample_period=1.0 / SIMULATION_FREQUENCY, site_id='site')
+    # Staged through the publisher: alert writes ride the tick's update instead of blocking it
+    alert_log = AlertLog(publisher, 'recommendations', clock=clock) if publisher else None
     print("[ALERTS] ✅ Actionable alerts engine ready.")
 
     # ── Command Queue (Supervisor Overrides) ──
@@ -231,17 +276,18 @@ def main():
 
     # Initialize Machines
     machines = {}
-    for i in range(5):
+    for i in range(NUM_MACHINES):
         mid = f"CONST-{str(i+1).zfill(3)}"
         mtype = MACHINE_TYPES[i % len(MACHINE_TYPES)]
-        machines[mid] = Machine(mid, mtype)
+        machines[mid] = Machine(mid, mtype, clock=clock, alert_levels=alerts_engine.alert_levels('machine'))
 
     # Initialize Workers with DETERMINISTIC machine assignment
     workers = {}
     for i in range(NUM_WORKERS):
         wid = f"W{i+1}"
         assigned_mid = WORKER_MACHINE_MAP[wid]
-        workers[wid] = Worker(wid, assigned_mid)
+        workers[wid] = Worker(wid, assigned_mid, clock=clock, alert_levels=alerts_engine.alert_levels('worker'))
+    machine_workers = build_machine_index(workers)
 
     # Initialize Site Environment
     site_env = SiteEnvironment()
@@ -261,9 +307,13 @@ def main():
         print(f"  {wid} -> {w.assigned_machine_id}")
     print("\nStarting simulation loop...")
     tick_count = 0
+    published_ticks = 0
+    sim_ticks = 0
+    wall_start = time.time()
 
-    while True:
-        loop_start = time.time()
+    while not fast_forward or sim_ticks < fast_forward_ticks:
+        loop_start = clock.time()
+        sim_ticks += 1
 
         # --- Hard Reset Check ---
         if escalation_mgr.needs_reset:
@@ -278,7 +328,7 @@ def main():
         env_data = site_env.update()
 
         # --- Process Command Queue ---
-        now = time.time()
+        now = clock.time()
         # Ingest pending commands
         while pending_commands:
             cmd_id, cmd = pending_commands.pop(0)
@@ -315,13 +365,10 @@ def main():
 
             active_overrides[target_id] = override
 
-            # Acknowledge the command in Firebase
-            if site_ref:
-                try:
-                    site_ref.child(f'commands/{cmd_id}/status').set('APPLIED')
-                    site_ref.child(f'commands/{cmd_id}/applied_at').set(now * 1000)
-                except Exception:
-                    pass
+            # Acknowledge the command in Firebase (sent with this tick's update, retried if lost)
+            if publisher:
+                publisher.stage_once(f'commands/{cmd_id}/status', 'APPLIED')
+                publisher.stage_once(f'commands/{cmd_id}/applied_at', now * 1000)
 
         # Expire old overrides
         expired = [k for k, v in active_overrides.items() if now > v['expires_at']]
@@ -329,18 +376,16 @@ def main():
             print(f"\n[CMD] Override expired: {active_overrides[k]['action']} on {k}")
             del active_overrides[k]
 
+        # --- Escalation factors: computed once per tick, shared by machines and workers ---
+        esc_factors = escalation_mgr.get_factors()
+
         # --- Update Machines ---
         machine_data = {}
         machine_stress = {}
 
         for mid, machine in machines.items():
-            # Find max escalation factor among workers assigned to this machine
-            max_esc = 0.0
-            for wid, w in workers.items():
-                if w.assigned_machine_id == mid:
-                    f = escalation_mgr.get_factor(wid)
-                    if f > max_esc:
-                        max_esc = f
+            # Max escalation factor among workers assigned to this machine
+            max_esc = max((esc_factors.get(wid, 0.0) for wid in machine_workers.get(mid, ())), default=0.0)
 
             # Apply supervisor load cap if active
             load_cap = None
@@ -356,7 +401,7 @@ def main():
         worker_data = {}
         for wid, worker in workers.items():
             m_stress = machine_stress.get(worker.assigned_machine_id, 0)
-            esc_factor = escalation_mgr.get_factor(wid)
+            esc_factor = esc_factors.get(wid, 0.0)
 
             # Apply supervisor force_break if active
             force_break = False
@@ -371,9 +416,10 @@ def main():
                                     force_break=force_break)
             worker_data[wid] = w_state
 
+        tick_count += 1
+
         # --- PdM: Push sensor data and run inference ---
         if pdm_engine:
-            tick_count += 1
             for mid, m_state in machine_data.items():
                 pdm_engine.push_reading(
                     mid,
@@ -385,68 +431,103 @@ def main():
                     env_data.get('ambient_temp_c', 30.0),
                 )
 
-            # Run inference every 5 ticks to avoid overhead
-            if tick_count % 5 == 0:
-                pdm_predictions = {}
-                for mid in machines:
-                    try:
-                        result = pdm_engine.predict(mid)
-                        if result:
-                            pdm_predictions[mid] = result
-                    except Exception as e:
-                        print(f"\n[PdM] Prediction error for {mid}: {e}")
-
-                if pdm_predictions and site_ref:
-                    try:
-                        site_ref.child('maintenance').update(pdm_predictions)
-                    except Exception as e:
-                        print(f"\n[PdM] Firebase write error: {e}")
-
-        # --- Actionable Alerts: Evaluate every 5 ticks ---
-        if tick_count % 5 == 0:
+            # Incremental inference only computes the new steps, so it runs every tick;
+            # full forward passes every 5 ticks to avoid overhead (once the model is ready)
+            pdm_interval = 1 if pdm_engine.incremental else 5
+            if tick_count % pdm_interval == 0 and pdm_engine.is_loaded:
+                # Single batched forward pass for the whole fleet
+                try:
+                    pdm_predictions = pdm_engine.predict_many(machines)
+                except Exception as e:
+                    pdm_predictions = {}
+                    print(f"\n[PdM] Batched prediction error: {e}")
+
+                if pdm_predictions and publisher:
+                    publisher.stage('maintenance', pdm_predictions)
+
+        # --- Actionable Alerts ---
+        recs = None
+        if ALERT_MODE == 'incremental':
+            # Every tick, but only entities whose alert metrics crossed a level (plus those still breaching)
+            dirty_workers = [wid for wid, w in workers.items() if w.dirty]
+            dirty_machines = [mid for mid, m in machines.items() if m.dirty]
+            recs = alerts_engine.evaluate_incremental(worker_data, machine_data, env_data,
+                                                      dirty_workers, dirty_machines)
+            for wid in dirty_workers:
+                workers[wid].mark_clean()
+            for mid in dirty_machines:
+                machines[mid].mark_clean()
+        elif tick_count % ALERT_EVAL_INTERVAL == 0:
             recs = alerts_engine.evaluate(worker_data, machine_data, env_data)
-            if recs and site_ref:
+        else:
+            # Keep streaming rules (windows, sustained timers, hysteresis) fed every tick
+            alerts_engine.observe(worker_data, machine_data, env_data)
+
+        if recs is not None:
+            if alert_log:
                 try:
-                    # Push latest recommendations (overwrite for real-time)
-                    site_ref.child('recommendations').set({
-                        "alerts": recs,
-                        "count": len(recs),
-                        "timestamp": time.time() * 1000,
-                    })
+                    # Stage new alerts and retirements (no full-list rewrite); flushed below
+                    alert_log.publish(recs)
                 except Exception as e:
                     print(f"\n[ALERTS] Firebase write error: {e}")
 
         # --- Push to Firebase ---
-        # CRITICAL FIX: Write to SPECIFIC paths to avoid overwriting escalation_trigger
-        if site_ref:
+        # Changed leaf paths only, coalesced into ONE multi-path update at the site root.
+        # Leaf paths never replace a whole node, so escalation_trigger is left untouched.
+        if publisher:
             try:
-                site_ref.child('machines').update(machine_data)
-                site_ref.child('workers').update(worker_data)
-                site_ref.child('env').set(env_data)
-                site_ref.child('last_updated').set(time.time())
-                # Write escalation status to SEPARATE keys (NOT replacing the whole 'events' object)
-                site_ref.child('events/escalation_active').set(escalation_mgr.is_active)
-                site_ref.child('events/escalation_progress').set(
-                    int(time.time() - escalation_mgr.start_time) if escalation_mgr.is_active else 0
+                publisher.stage('machines', machine_data)
+                publisher.stage('workers', worker_data)
+                publisher.stage('env', env_data)
+                publisher.stage('last_updated', clock.time())
+                publisher.stage('events/escalation_active', escalation_mgr.is_active)
+                publisher.stage('events/escalation_progress',
+                    int(clock.time() - escalation_mgr.start_time) if escalation_mgr.is_active else 0
                 )
-                print(".", end="", flush=True)
+                publisher.flush()
+                published_ticks += 1
+                if not fast_forward:
+                    print(".", end="", flush=True)
+                    if published_ticks % PUBLISH_STATS_INTERVAL == 0:
+                        print(f"\n[PUB] {uplink.stats()}")
+                        if pdm_engine:
+                            print(f"[PdM] gate {pdm_engine.gate_stats()}")
             except Exception as e:
                 print(f"\nError pushing to Firebase: {e}")
-        else:
+        elif not fast_forward:
             # Mock mode
-            print(f"\n[MOCK] tick={int(time.time())}")
+            print(f"\n[MOCK] tick={int(clock.time())}")
             if escalation_mgr.is_active:
-                elapsed = int(time.time() - escalation_mgr.start_time)
+                elapsed = int(clock.time() - escalation_mgr.start_time)
                 print(f"  Escalation active for {elapsed}s")
             for wid in sorted(worker_data.keys(), key=lambda x: int(x[1:])):
                 wd = worker_data[wid]
                 print(f"  {wid}: HR={wd['heart_rate_bpm']} Fat={wd['fatigue_percent']}% CIS={wd['cis_score']} [{wd['cis_risk_level']}]")
 
         # --- Sleep ---
-        elapsed = time.time() - loop_start
-        sleep_time = max(0, (1.0 / SIMULATION_FREQUENCY) - elapsed)
-        time.sleep(sleep_time)
+        if fast_forward:
+            # Simulated time advances by exactly one tick period
+            clock.advance(1.0 / SIMULATION_FREQUENCY)
+            if sim_ticks % 3600 == 0:
+                print(f"[FAST-FORWARD] {sim_ticks}/{fast_forward_ticks} ticks")
+        else:
+            elapsed = clock.time() - loop_start
+            sleep_time = max(0, (1.0 / SIMULATION_FREQUENCY) - elapsed)
+            clock.sleep(sleep_time)
+
+    wall = time.time() - wall_start
+    print(f"\n[FAST-FORWARD] {sim_ticks} ticks ({sim_ticks / SIMULATION_FREQUENCY:.0f} simulated s) "
+          f"in {wall:.1f} s wall time ({sim_ticks / max(wall, 1e-9):.0f} ticks/s)")
+    if pdm_engine:
+        print(f"[PdM] gate {pdm_engine.gate_stats()}")
+    if site_ref:
+        site_ref.sink.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Harmony Aura site simulation")
+    parser.add_argument("--fast-forward", type=int, metavar="TICKS", default=None,
+                        help="run TICKS ticks headless on a simulated clock, as fast as the CPU allows "
+                             "(86400 = one simulated day at 1 Hz)")
+    args = parser.parse_args()
+    main(fast_forward_ticks=args.fast_forward)
@@ -0,0 +1,331 @@
+"""
+Telemetry Sinks
+================
+Pluggable storage backends behind a small subset of the Firebase Realtime
+Database `Reference` API (child / set / update / push / listen), so the
+simulation, EscalationManager and SyntheticInjector run unchanged against:
+
+  - "firebase": live Realtime Database via firebase_admin
+  - "memory":   in-process JSON tree (load testing without network access)
+  - "file":     append-only JSON-lines log of every write
+  - "http":     in-memory tree served over a local RTDB-style REST API
+
+Select a backend with the SINK_BACKEND environment variable (see config.py).
+"""
+
+import atexit
+import copy
+import itertools
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import (FIREBASE_CREDENTIALS_PATH, FIREBASE_DB_URL, SINK_BACKEND, SINK_FILE_PATH,
+                    SINK_HTTP_HOST, SINK_HTTP_PORT)
+
+# Mirrors firebase_admin.db.Event: event_type, path (relative to listener), data
+SinkEvent = namedtuple("SinkEvent", ["event_type", "path", "data"])
+
+
+def _join(*parts):
+    return "/".join(p.strip("/") for p in parts if p and p.strip("/"))
+
+
+class SinkRef:
+    """Reference-like handle to a path inside a sink."""
+
+    def __init__(self, sink, path=""):
+        self.sink = sink
+        self.path = path.strip("/")
+
+    def child(self, path):
+        return SinkRef(self.sink, _join(self.path, path))
+
+    def get(self):
+        return self.sink.get(self.path)
+
+    def set(self, value):
+        self.sink.set(self.path, value)
+
+    def update(self, updates):
+        """Multi-path update: keys may contain '/' and are relative to this ref."""
+        self.sink.update(self.path, updates)
+
+    def push(self, value):
+        return self.child(self.sink.push(self.path, value))
+
+    def listen(self, callback):
+        return self.sink.listen(self.path, callback)
+
+
+class Sink:
+    """Base class: a hierarchical key/value store addressed by '/' paths."""
+
+    def reference(self, path=""):
+        return SinkRef(self, path)
+
+    def get(self, path):
+        raise NotImplementedError
+
+    def set(self, path, value):
+        raise NotImplementedError
+
+    def update(self, path, updates):
+        raise NotImplementedError
+
+    def push(self, path, value):
+        """Append `value` under a generated, time-ordered key. Returns the key."""
+        raise NotImplementedError
+
+    def listen(self, path, callback):
+        """Register callback(SinkEvent) for writes at or below `path`. May be a no-op."""
+        return None
+
+    def close(self):
+        pass
+
+
+# ─────────────────────────────────────────────────
+# Firebase Realtime Database
+# ─────────────────────────────────────────────────
+
+class FirebaseSink(Sink):
+    def __init__(self, credentials_path=FIREBASE_CREDENTIALS_PATH, db_url=FIREBASE_DB_URL):
+        import firebase_admin
+        from firebase_admin import credentials, db
+
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(credentials_path)
+            firebase_admin.initialize_app(cred, {'databaseURL': db_url})
+        self._db = db
+
+    def _ref(self, path):
+        return self._db.reference(path or "/")
+
+    def get(self, path):
+        return self._ref(path).get()
+
+    def set(self, path, value):
+        self._ref(path).set(value)
+
+    def update(self, path, updates):
+        self._ref(path).update(updates)
+
+    def push(self, path, value):
+        return self._ref(path).push(value).key
+
+    def listen(self, path, callback):
+        return self._ref(path).listen(callback)
+
+
+# ─────────────────────────────────────────────────
+# In-Memory JSON Tree
+# ─────────────────────────────────────────────────
+
+class InMemorySink(Sink):
+    """Thread-safe JSON tree with Firebase-like listener callbacks."""
+
+    def __init__(self):
+        self._root = {}
+        self._lock = threading.RLock()
+        self._listeners = []  # (path, callback)
+        self._push_ids = itertools.count()
+        self.writes = 0
+
+    def _node(self, path):
+        node = self._root
+        for key in filter(None, path.split("/")):
+            if not isinstance(node, dict) or key not in node:
+                return None
+            node = node[key]
+        return node
+
+    def _write(self, path, value):
+        keys = [k for k in path.split("/") if k]
+        if not keys:
+            self._root = copy.deepcopy(value) if isinstance(value, dict) else {}
+            return
+        node = self._root
+        for key in keys[:-1]:
+            child = node.get(key)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[key] = {}
+            node = child
+        if value is None:
+            node.pop(keys[-1], None)
+        else:
+            node[keys[-1]] = copy.deepcopy(value)
+
+    def get(self, path):
+        with self._lock:
+            return copy.deepcopy(self._node(path))
+
+    def set(self, path, value):
+        self._apply({path.strip("/"): value})
+
+    def update(self, path, updates):
+        self._apply({_join(path, key): value for key, value in updates.items()})
+
+    def push(self, path, value):
+        key = f"-{int(time.time() * 1000):013d}{next(self._push_ids):06d}"
+        self.set(_join(path, key), value)
+        return key
+
+    def _apply(self, writes):
+        with self._lock:
+            for path, value in writes.items():
+                self._write(path, value)
+            self.writes += len(writes)
+            listeners = list(self._listeners)
+        # Fire callbacks outside the lock so they may write back
+        for listen_path, callback in listeners:
+            for path, value in writes.items():
+                if path == listen_path or path.startswith(listen_path + "/") or not listen_path:
+                    rel = "/" + path[len(listen_path):].strip("/")
+                    callback(SinkEvent("put", rel, copy.deepcopy(value)))
+                elif listen_path.startswith(path + "/") or not path:
+                    callback(SinkEvent("put", "/", self.get(listen_path)))
+
+    def listen(self, path, callback):
+        path = path.strip("/")
+        with self._lock:
+            self._listeners.append((path, callback))
+        # Initial snapshot, as Firebase delivers on subscribe
+        callback(SinkEvent("put", "/", self.get(path)))
+        return callback
+
+
+# ─────────────────────────────────────────────────
+# Append-Only JSON-Lines Log
+# ─────────────────────────────────────────────────
+
+class FileSink(Sink):
+    """Appends every write as one JSON line: {"ts", "op", "path", "data"}.
+    Each line is flushed as it is written, so tailing readers see every tick."""
+
+    def __init__(self, filepath=SINK_FILE_PATH):
+        self.filepath = filepath
+        self._file = open(filepath, "a")
+        self._lock = threading.Lock()
+        self._push_ids = itertools.count()
+        self.writes = 0
+        atexit.register(self.close)
+
+    def _append(self, op, path, data):
+        line = json.dumps({"ts": time.time(), "op": op, "path": path, "data": data}, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.writes += 1
+
+    def get(self, path):
+        return None  # Write-only log
+
+    def set(self, path, value):
+        self._append("set", path, value)
+
+    def update(self, path, updates):
+        self._append("update", path, updates)
+
+    def push(self, path, value):
+        key = f"-{int(time.time() * 1000):013d}{next(self._push_ids):06d}"
+        self._append("set", _join(path, key), value)
+        return key
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+# ─────────────────────────────────────────────────
+# Local HTTP Stand-In (RTDB REST-style)
+# ─────────────────────────────────────────────────
+
+class HttpSink(InMemorySink):
+    """In-memory tree exposed over HTTP with Realtime Database REST semantics:
+    GET/PUT/PATCH/POST/DELETE on /<path>.json. Writes made over HTTP fire the
+    same listeners as local writes, so clients can e.g. trigger escalation.
+    """
+
+    def __init__(self, host=SINK_HTTP_HOST, port=SINK_HTTP_PORT):
+        super().__init__()
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _path(self):
+                path = self.path.split("?", 1)[0]
+                return path[:-len(".json")] if path.endswith(".json") else path
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def _reply(self, data, status=200):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._reply(sink.get(self._path()))
+
+            def do_PUT(self):
+                data = self._body()
+                sink.set(self._path(), data)
+                self._reply(data)
+
+            def do_PATCH(self):
+                data = self._body()
+                sink.update(self._path(), data)
+                self._reply(data)
+
+            def do_POST(self):
+                self._reply({"name": sink.push(self._path(), self._body())})
+
+            def do_DELETE(self):
+                sink.set(self._path(), None)
+                self._reply(None)
+
+            def log_message(self, format, *args):
+                pass  # Keep request logging out of throughput measurements
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="http-sink", daemon=True)
+        self._thread.start()
+        print(f"[SINK] HTTP stand-in listening on http://{host}:{self._server.server_port}/")
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()  # release the listening socket
+
+
+def create_sink(backend=SINK_BACKEND):
+    """Build the configured sink. Returns None when Firebase is selected but unavailable."""
+    if backend == "memory":
+        return InMemorySink()
+    if backend == "file":
+        return FileSink()
+    if backend == "http":
+        return HttpSink()
+    if backend != "firebase":
+        raise ValueError(f"Unknown sink backend: {backend}")
+
+    if not os.path.exists(FIREBASE_CREDENTIALS_PATH):
+        print(f"Warning: Firebase credentials not found at {FIREBASE_CREDENTIALS_PATH}")
+        print("Using mock mode (printing to console instead of Firebase)")
+        return None
+    try:
+        sink = FirebaseSink()
+        print("Firebase initialized successfully.")
+        return sink
+    except Exception as e:
+        print(f"Failed to initialize Firebase: {e}")
+        return None
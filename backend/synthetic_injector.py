@@ -1,25 +1,19 @@
-import time
 import random
 import threading
-import firebase_admin
-from firebase_admin import credentials, db
-from config import FIREBASE_CREDENTIALS_PATH, FIREBASE_DB_URL
+from clock import SYSTEM_CLOCK
+from sinks import create_sink
 
-def initialize_firebase():
-    try:
-        cred = credentials.Certificate(FIREBASE_CREDENTIALS_PATH)
-        firebase_admin.initialize_app(cred, {
-            'databaseURL': FIREBASE_DB_URL
-        })
-        print("Firebase initialized successfully for Synthetic Injector.")
-        return db.reference('site/iot/synthetic/device_01')
-    except Exception as e:
-        print(f"Failed to initialize Firebase: {e}")
+def initialize_sink():
+    sink = create_sink()
+    if sink is None:
         return None
+    print("Sink initialized successfully for Synthetic Injector.")
+    return sink.reference('site/iot/synthetic/device_01')
 
 class SyntheticInjector:
-    def __init__(self, db_ref):
+    def __init__(self, db_ref, clock=None):
         self.db_ref = db_ref
+        self.clock = clock or SYSTEM_CLOCK
         self.spo2 = 98.0
         self.noise = 65.0
         self.wind = 12.0
@@ -37,7 +31,7 @@ class SyntheticInjector:
                 "spo2_pct": round(self.spo2, 1),
                 "ambient_noise_db": round(self.noise, 1),
                 "wind_speed_kmh": round(self.wind, 1),
-                "timestamp": int(time.time() * 1000)
+                "timestamp": int(self.clock.time() * 1000)
             }
 
             try:
@@ -46,10 +40,10 @@ class SyntheticInjector:
             except Exception as e:
                 print(f"Failed to push synthetic data: {e}")
 
-            time.sleep(2) # Update every 2 seconds
+            self.clock.sleep(2) # Update every 2 seconds
 
 if __name__ == "__main__":
-    db_ref = initialize_firebase()
+    db_ref = initialize_sink()
     if db_ref:
         injector = SyntheticInjector(db_ref)
         try:
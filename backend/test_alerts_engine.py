@@ -0,0 +1,61 @@
+"""
+Tests for the streaming state of the alerts engine under entity churn.
+
+  python -m pytest backend/test_alerts_engine.py
+"""
+
+import numpy as np
+
+from alerts_engine import ALERT_RULES, ActionableAlertsEngine, AlertRule
+from clock import SimulatedClock
+
+ENV = {"ambient_temp_c": 30, "humidity_pct": 50}
+
+
+def _workers(ids, hr=100.0):
+    return {wid: {"heart_rate_bpm": hr, "cis_score": 0.1, "fatigue_percent": 10} for wid in ids}
+
+
+def _check_stream(stream):
+    assert len(stream._ids) <= stream.max_rows
+    assert sorted(stream._ids.values()) == sorted(set(stream._ids.values()))
+    for eid, row in stream._ids.items():
+        assert stream._row_ids[row] == eid
+
+
+def test_fresh_rows_and_evictions_in_one_batch():
+    engine = ActionableAlertsEngine(clock=SimulatedClock(), max_entities=10)
+    engine.evaluate(_workers([f"A{i}" for i in range(8)]), {}, ENV)
+    # 2 fresh rows left, 3 rows must be evicted for the same batch
+    engine.evaluate(_workers([f"B{i}" for i in range(5)]), {}, ENV)
+    stream = engine._streams["worker"]
+    _check_stream(stream)
+    assert stream.evictions == 3
+    assert all(f"B{i}" in stream._ids for i in range(5))
+
+
+def test_churn_recycles_stream_state():
+    rules = ALERT_RULES + (
+        AlertRule("hr_mean", "worker", "heart_rate_bpm", ">=", 1000, "INFO", "-", "{id} {value}",
+                  kind="mean", window=3),
+        AlertRule("hr_sustained", "worker", "heart_rate_bpm", ">=", 50, "INFO", "-", "{id} {value}",
+                  kind="sustained", window=5),
+    )
+    clock = SimulatedClock()
+    engine = ActionableAlertsEngine(rules=rules, clock=clock, max_entities=10)
+    stream = engine._streams["worker"]
+    window = next(iter(stream.windows.values()))
+    rng = np.random.default_rng(0)
+    for batch in range(12):
+        ids = [f"W{batch}-{i}" for i in rng.permutation(7)]
+        hr = 60.0 + batch
+        engine.evaluate(_workers(ids, hr=hr), {}, ENV)
+        clock.advance(1.0)
+        _check_stream(stream)
+        rows = stream.rows(ids)
+        # A recycled row starts clean: one sample of this entity only
+        np.testing.assert_allclose(window.mean(rows), hr)
+        index = [i for i, rule in enumerate(engine.rules) if rule.rule_id == "hr_sustained"][0]
+        assert (stream.since[index][rows] == clock.time() - 1.0).all()
+    assert stream.evictions > 0
+    assert stream._next_row == 10
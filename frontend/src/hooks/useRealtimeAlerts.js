@@ -1,28 +1,34 @@
 import { useState, useEffect } from 'react';
-import { ref, onValue, off } from 'firebase/database';
+import { ref, onChildAdded, onChildRemoved, off } from 'firebase/database';
 import { db } from '../firebase/config';
 
+// Alerts live under site/recommendations/alerts/<id>; IDs sort in emission order.
+// Child events deliver only alerts appended or retired since the last sync.
 const useRealtimeAlerts = () => {
-    const [alerts, setAlerts] = useState([]);
-    const [alertCount, setAlertCount] = useState(0);
+    const [alertMap, setAlertMap] = useState({});
 
     useEffect(() => {
-        const recsRef = ref(db, 'site/recommendations');
-        const handleData = (snapshot) => {
-            const data = snapshot.val();
-            if (data && data.alerts) {
-                setAlerts(data.alerts);
-                setAlertCount(data.count || data.alerts.length);
-            } else {
-                setAlerts([]);
-                setAlertCount(0);
-            }
+        const alertsRef = ref(db, 'site/recommendations/alerts');
+        const handleAdded = (snapshot) => {
+            setAlertMap((prev) => ({ ...prev, [snapshot.key]: snapshot.val() }));
+        };
+        const handleRemoved = (snapshot) => {
+            setAlertMap((prev) => {
+                const next = { ...prev };
+                delete next[snapshot.key];
+                return next;
+            });
+        };
+        onChildAdded(alertsRef, handleAdded);
+        onChildRemoved(alertsRef, handleRemoved);
+        return () => {
+            off(alertsRef, 'child_added', handleAdded);
+            off(alertsRef, 'child_removed', handleRemoved);
         };
-        onValue(recsRef, handleData);
-        return () => off(recsRef, handleData);
     }, []);
 
-    return { alerts, alertCount };
+    const alerts = Object.keys(alertMap).sort().reverse().map((id) => alertMap[id]);
+    return { alerts, alertCount: alerts.length };
 };
 
 export default useRealtimeAlerts;
@@ -183,7 +183,13 @@ class AlertsScreen extends StatelessWidget {
         }
 
         final data = snapshot.data!.snapshot.value as Map;
-        final List<dynamic> alertsList = data['alerts'] is List ? data['alerts'] : [];
+        // Alerts are keyed by ID (sortable in emission order); newest first
+        final rawAlerts = data['alerts'];
+        final List<dynamic> alertsList = rawAlerts is Map
+            ? (rawAlerts.keys.map((k) => k.toString()).toList()..sort((a, b) => b.compareTo(a)))
+                .map((k) => rawAlerts[k])
+                .toList()
+            : rawAlerts is List ? rawAlerts : [];
 
         if (alertsList.isEmpty) return const SizedBox.shrink();
 